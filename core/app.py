@@ -1,6 +1,8 @@
 from core.help_functions.LLMClient import LLMClient
 from core.help_functions.detecting_location import disambiguate_location
-from core.error.errors import TravelDurationError, StarRequirementError, LocationError
+from core.help_functions.place_type_mapper import EmbeddingPlaceTypeMapper
+from core.help_functions.query_cache import QueryCache
+from core.error.errors import TravelDurationError, StarRequirementError, LocationError, LLMError
 
 from datetime import datetime
 import pytz
@@ -13,18 +15,45 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+PLACE_TYPE_PROMPT = """
+You are an expert in categorizing place types for the Google Maps Places API.
+Given a custom place type, map it to the closest matching Google Maps place type from the following list:
+{allowed_places}
+
+Return the result as a JSON object with the key "google_place_type" and the mapped type as the value.
+If no match is found, return "unknown".
+"""
+
 class FunctionCallingAgent:
-    def __init__(self):
+    def __init__(self, single_call: bool = False, place_type_threshold: float = 0.6):
+        """
+        Args:
+            single_call: Let the extraction call return the Google place type directly (constrained to
+                         lib/allowed_places.yaml) instead of mapping it with a second LLM call.
+            place_type_threshold: Cosine similarity above which the local embedding mapper's place type
+                                  is used without asking the LLM.
+        """
         self.client = LLMClient(api_key=os.getenv('OPENAI_API_KEY'))
+        self.single_call = single_call
         with open('lib/config.yaml', 'r', encoding='utf-8') as f:
             self.config = yaml.safe_load(f)
+        # Everything except the settings block describes a field to extract
+        self.settings = self.config.pop('settings', None) or {}
+        self.query_cache = QueryCache.from_config(self.settings.get('query_cache'))
         with open('lib/allowed_places.yaml', 'r', encoding='utf-8') as f:
             self.place_config = yaml.safe_load(f)
+        # Embeddings of every allowed type and synonym are computed once, here
+        self.place_type_mapper = EmbeddingPlaceTypeMapper(
+            self.place_config['allowed_places'],
+            synonyms=self.place_config.get('synonyms'),
+            threshold=place_type_threshold
+        )
 
         json_format = json.dumps({key: item['type'] for key, item in self.config.items()}, indent=2)
-        detail_instruction = '\n'.join([str(index)+'. '+'**'+key+'** '+item["description"]+'\n'+item["prompt"] for index, (key, item) in enumerate(self.config.items(), start=1)])
+        detail_instruction = '\n'.join([str(index)+'. '+'**'+key+'** '+item["description"]+'\n'+self._field_prompt(item) for index, (key, item) in enumerate(self.config.items(), start=1)])
         example_output = json.dumps({key: item['example'] for key, item in self.config.items()}, indent=2)
-        self.prompt = f"""You are a highly accurate information extraction assistant. Your task is to extract specific details from a user's query regarding a local search. You will receive a user query as input and must return a JSON object containing the extracted information.  If a particular piece of information is *not* present in the query, its corresponding value in the JSON should be `null` (not "None").  
+        # Field instructions without the trailing query slot, shared with core.batch_extraction
+        self.instructions = f"""You are a highly accurate information extraction assistant. Your task is to extract specific details from a user's query regarding a local search. You will receive a user query as input and must return a JSON object containing the extracted information.  If a particular piece of information is *not* present in the query, its corresponding value in the JSON should be `null` (not "None").  
 **Here's the JSON format you *must* use:**
 ```json
 {json_format}
@@ -46,9 +75,19 @@ class FunctionCallingAgent:
 ```json
 {example_output}
 ```
- 
-**Now, process the following user query:**
 """
+        # Everything static goes into the system message so its tokens form an identical prefix on every
+        # call, which provider-side prompt caching can reuse; the user message is only the query
+        self.system_prompt = self.instructions + """ 
+**Now, process the user query given in the user message.**
+"""
+        self.place_type_prompt = PLACE_TYPE_PROMPT.format(allowed_places=', '.join(self.place_config['allowed_places']))
+
+    def _field_prompt(self, item: Dict) -> str:
+        """Instructions for one config field, using its single-call variant when enabled."""
+        if self.single_call and "single_call_prompt" in item:
+            return item["single_call_prompt"].replace("{allowed_places}", ", ".join(self.place_config['allowed_places']))
+        return item["prompt"]
 
     def query(self, user_query: str, geolocation_coords: Optional[Tuple[float, float]] = None, context: Optional[Dict] = None) -> Dict:
         """
@@ -69,12 +108,7 @@ class FunctionCallingAgent:
 
         # Call LLM to extract fields
         try:
-            llm_result = self.client.call_llm(
-                system_prompt="You are a good assistant",
-                user_prompt=self.prompt + user_query,
-            )
-            print(llm_result)
-            # llm_result = self.safe_parse_json(llm_result)
+            extracted = self.extract(user_query)
         except Exception as e:
             # logging.error(f"LLM call failed: {e}")
             return {
@@ -83,15 +117,6 @@ class FunctionCallingAgent:
                 "prompt": "Please rephrase your query and try again."
             }
 
-        # Expected fields from LLM
-        extracted = {
-            "location": llm_result.get("location"),
-            "place_to_search": llm_result.get("place_to_search"),
-            "travel_duration": llm_result.get("travel_duration"),
-            "minimum_star_requirement": llm_result.get("minimum_star_requirement"),
-            "additional_requests": llm_result.get("additional_requests")
-        }
-
         # Initialize result and errors
         validated = {}
         errors = []
@@ -102,29 +127,7 @@ class FunctionCallingAgent:
             location_result = self._check_location(extracted["location"], geolocation_coords)
             if location_result.get("options"):  # Ambiguous location
                 ambiguous["location"] = location_result["options"]
-                # Store context for disambiguation
-                context = {
-                    "is_disambiguation": True,
-                    "original_query": user_query,
-                    "extracted": extracted,
-                    "location_options": location_result["options"],
-                    "geolocation_coords": geolocation_coords
-                }
-                # Generate LLM prompt for user selection
-                options_text = "\n".join(
-                    f"{idx + 1}. {opt['value']}" for idx, opt in enumerate(location_result["options"])
-                )
-                prompt = (
-                    f"Multiple locations found for '{extracted['location']}':\n"
-                    f"{options_text}\n"
-                    "Please select the correct location by entering the number or the location name (e.g., '1' or 'Springfield, IL'). "
-                    "Enter 'cancel' to cancel."
-                )
-                return {
-                    "status": "prompt",
-                    "prompt": prompt,
-                    "context": context
-                }
+                return self.location_prompt(user_query, extracted, location_result["options"], geolocation_coords)
             else:
                 validated["location"] = location_result
         except LocationError as e:
@@ -132,42 +135,136 @@ class FunctionCallingAgent:
             validated["location"] = None
 
         # 2. Validate place_to_search
-        validated["place_to_search"] = self._check_place_to_search(extracted["place_to_search"])
+        validated["place_to_search"] = self.map_place_type(extracted["place_to_search"])
+
+        # 3. Validate travel_duration, minimum_star_requirement and additional_requests
+        fields, field_errors = self.validate_fields(extracted)
+        validated.update(fields)
+        errors.extend(field_errors)
+
+        # Determine response status
+        if errors:
+            return {
+                "status": "error",
+                "errors": errors,
+                "prompt": "Please clarify the following issues:\n" + "\n".join(errors)
+            }
+        else:
+            return {
+                "status": "success",
+                "validated": validated
+            }
+
+    def extract(self, user_query: str) -> Dict:
+        """
+        Call the LLM to extract the raw search fields from a user query.
+        Args:
+            user_query: User input (e.g., "Find me a rooftop bar in Springfield with 4 stars").
+        Returns:
+            Dict with location, place_to_search, travel_duration, minimum_star_requirement and
+            additional_requests as returned by the LLM (not yet validated).
+        """
+        # Same or near-duplicate queries reuse an earlier extraction
+        if self.query_cache is not None:
+            cached = self.query_cache.get(user_query)
+            if cached is not None:
+                return cached
+
+        llm_result = self.client.call_llm(
+            system_prompt=self.system_prompt,
+            user_prompt=user_query,
+        )
+        print(llm_result)
+        self._report_usage("extract")
+        # llm_result = self.safe_parse_json(llm_result)
+        extracted = self.parse_extraction(llm_result)
+        if self.query_cache is not None:
+            self.query_cache.put(user_query, extracted)
+        return extracted
+
+    @staticmethod
+    def parse_extraction(llm_result) -> Dict:
+        """
+        Keep the expected fields of an LLM extraction result.
+        Raises:
+            ValueError: If the LLM did not return a JSON object.
+        """
+        if not isinstance(llm_result, dict):
+            raise ValueError(f"Unexpected LLM result: {llm_result}")
+
+        # Expected fields from LLM
+        return {
+            "location": llm_result.get("location"),
+            "place_to_search": llm_result.get("place_to_search"),
+            "travel_duration": llm_result.get("travel_duration"),
+            "minimum_star_requirement": llm_result.get("minimum_star_requirement"),
+            "additional_requests": llm_result.get("additional_requests")
+        }
+
+    def validate_fields(self, extracted: Dict) -> Tuple[Dict, list]:
+        """
+        Validate the fields that need neither the user nor a network call: travel_duration,
+        minimum_star_requirement and additional_requests.
+        Args:
+            extracted: Output of extract().
+        Returns:
+            (validated fields, list of error messages); a field that fails validation is None.
+        """
+        validated = {}
+        errors = []
 
-        # 3. Validate travel_duration
         try:
-            travel_result = self._check_travel_duration(extracted["travel_duration"])
-            validated["travel_duration"] = travel_result
+            validated["travel_duration"] = self._check_travel_duration(extracted["travel_duration"])
         except TravelDurationError as e:
             errors.append(f"Travel duration error: {e}")
             validated["travel_duration"] = None
 
-        # 4. Validate minimum_star_requirement
         try:
-            star_result = self._check_minimum_star_requirement(
+            validated["minimum_star_requirement"] = self._check_minimum_star_requirement(
                 extracted["minimum_star_requirement"],
-                default_rating=3.5  # Optional: Default for null
+                default_rating=3.5
             )
-            validated["minimum_star_requirement"] = star_result
         except StarRequirementError as e:
             errors.append(f"Star requirement error: {e}")
             validated["minimum_star_requirement"] = None
 
-        # 5. Validate additional_requests
         validated["additional_requests"] = extracted["additional_requests"]
+        return validated, errors
 
-        # Determine response status
-        if errors:
-            return {
-                "status": "error",
-                "errors": errors,
-                "prompt": "Please clarify the following issues:\n" + "\n".join(errors)
-            }
-        else:
-            return {
-                "status": "success",
-                "validated": validated
-            }
+    def location_prompt(self, user_query: str, extracted: Dict, options: list, geolocation_coords: Optional[Tuple[float, float]] = None) -> Dict:
+        """
+        Build the "prompt" response asking the user to pick one of several matching locations.
+        Args:
+            user_query: Original user query.
+            extracted: Fields extracted from the query.
+            options: Location options from disambiguate_location.
+            geolocation_coords: User's current coordinates.
+        Returns:
+            Dict with status "prompt", the prompt text and the context for _handle_location_disambiguation.
+        """
+        # Store context for disambiguation
+        context = {
+            "is_disambiguation": True,
+            "original_query": user_query,
+            "extracted": extracted,
+            "location_options": options,
+            "geolocation_coords": geolocation_coords
+        }
+        # Generate LLM prompt for user selection
+        options_text = "\n".join(
+            f"{idx + 1}. {opt['value']}" for idx, opt in enumerate(options)
+        )
+        prompt = (
+            f"Multiple locations found for '{extracted['location']}':\n"
+            f"{options_text}\n"
+            "Please select the correct location by entering the number or the location name (e.g., '1' or 'Springfield, IL'). "
+            "Enter 'cancel' to cancel."
+        )
+        return {
+            "status": "prompt",
+            "prompt": prompt,
+            "context": context
+        }
 
     def _handle_location_disambiguation(self, user_response: str, context: Dict) -> Dict:
         """
@@ -270,22 +367,47 @@ class FunctionCallingAgent:
         else:
             raise LocationError(f"Could not resolve location: {location}")
     
-    def _check_place_to_search(self, place_to_search: Optional[str]) -> str:
-        prompt = f"""
-You are an expert in categorizing place types for the Google Maps Places API.
-Given a custom place type, map it to the closest matching Google Maps place type from the following list:
-{', '.join(self.place_config['allowed_places'])}
+    def map_place_type(self, place_to_search: Optional[str]) -> str:
+        """
+        Turn the extracted place_to_search into a Google place type.
+        Args:
+            place_to_search: Extracted place (e.g., "coffee shop", or "cafe" in single-call mode).
+        Returns:
+            Google Maps place type from lib/allowed_places.yaml, or "unknown".
+        """
+        if not place_to_search:
+            return "unknown"
 
-Custom place type: "{place_to_search}"
-Return the result as a JSON object with the key "google_place_type" and the mapped type as the value.
-If no match is found, return "unknown".
-"""
-        result = self.client.call_llm(
-                system_prompt="You are a good assistant",
-                user_prompt=prompt,
-            )
-        return result["google_place_type"]
+        # In single-call mode the extraction call usually returned a valid type already
+        if self.place_type_mapper.is_allowed(place_to_search):
+            return place_to_search
+
+        # Local nearest-neighbour mapping; the LLM is only asked when it isn't confident
+        mapped = self.place_type_mapper.map(place_to_search)
+        if mapped:
+            return mapped
+        return self._check_place_to_search(place_to_search)
+
+    def _check_place_to_search(self, place_to_search: Optional[str]) -> str:
+        try:
+            result = self.client.call_llm(
+                    system_prompt=self.place_type_prompt,
+                    user_prompt=f'Custom place type: "{place_to_search}"',
+                )
+        except LLMError as e:
+            print(f"Place type mapping failed for '{place_to_search}': {e}")
+            return "unknown"
+        self._report_usage("place_type")
+        return result.get("google_place_type") or "unknown"
     
+    def _report_usage(self, step: str):
+        """Print prompt tokens (and how many were served from the provider's prompt cache) of the last call."""
+        call = self.client.last_call
+        if call is None or call["prompt_tokens"] is None:
+            return
+        print(f"[{step}] prompt tokens: {call['prompt_tokens']} (cached: {call['cached_tokens'] or 0}), "
+              f"completion tokens: {call['completion_tokens']}, latency: {call['latency_seconds']:.2f}s")
+
     def _check_travel_duration(self, travel_duration: Optional[Dict]) -> Dict:
         """
         Validate and process travel duration.
@@ -457,6 +579,7 @@ if __name__ == '__main__':
         print(user_query)
         result = agent.query(user_query=user_query)
         print(result)
+        print(agent.client.stats())
         input('next')
 
 
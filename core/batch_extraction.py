@@ -0,0 +1,362 @@
+from core.app import FunctionCallingAgent
+from core.error.errors import LLMError
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+import argparse
+import json
+import time
+import os
+
+PACKED_INSTRUCTIONS = """
+**Several Queries:**
+You will receive several user queries, each on its own line prefixed with its index (e.g., "[3] ...").
+Process every query independently as described above and return a JSON object of the form
+{"results": [{"index": 3, <fields as in the JSON format above>}, ...]} with exactly one entry per query.
+"""
+
+# Endpoint that the requests of an OpenAI batch input file are sent to
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def read_queries(path: str) -> Iterator[Dict]:
+    """
+    Queries from a JSONL file. Each line is either {"id": ..., "query": "..."} or a bare JSON
+    string; lines without an id are numbered by their position in the file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"query": record}
+            yield {"id": str(record.get("id", line_number)), "query": record["query"]}
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids already written to an output JSONL, i.e. the checkpoint to resume from."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                # A line cut short by an interrupted run is simply processed again
+                continue
+    return done
+
+
+def chunked(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchExtractor:
+    def __init__(self, agent: Optional[FunctionCallingAgent] = None, pack_size: int = 10, max_workers: int = 4):
+        """
+        Bulk LLM extraction for query files.
+
+        Several queries are packed into one LLM request (one shared copy of the field instructions
+        instead of one per query) and packs are sent concurrently. Results are validated without the
+        interactive steps of FunctionCallingAgent.query: the place type is mapped with the local
+        embedding mapper only and locations are kept as extracted, to be geocoded downstream.
+        Args:
+            agent: FunctionCallingAgent whose prompt, LLM client and validators are used (created if None).
+            pack_size: Number of queries per LLM request.
+            max_workers: Number of LLM requests in flight.
+        """
+        self.agent = agent or FunctionCallingAgent()
+        self.pack_size = pack_size
+        self.max_workers = max_workers
+        self.system_prompt = self.agent.instructions + PACKED_INSTRUCTIONS
+
+    @staticmethod
+    def pack_prompt(records: List[Dict]) -> str:
+        return "\n".join(f"[{index}] {record['query']}" for index, record in enumerate(records))
+
+    def messages(self, records: List[Dict]) -> List[Dict]:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self.pack_prompt(records)}
+        ]
+
+    def unpack(self, records: List[Dict], llm_result) -> Dict[int, Dict]:
+        """
+        Map the entries of a packed LLM result back to the positions of records.
+        Entries with an unknown or duplicate index are dropped.
+        """
+        unpacked = {}
+        if not isinstance(llm_result, dict) or not isinstance(llm_result.get("results"), list):
+            return unpacked
+        for entry in llm_result["results"]:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get("index"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(records) and index not in unpacked:
+                unpacked[index] = self.agent.parse_extraction(entry)
+        return unpacked
+
+    def validate(self, record: Dict, extracted: Dict) -> Dict:
+        """Output line for one query: its extraction plus the validated fields."""
+        validated, errors = self.agent.validate_fields(extracted)
+        validated["location"] = extracted["location"]
+        validated["place_to_search"] = self.agent.place_type_mapper.map(extracted["place_to_search"]) or "unknown"
+        return {
+            "id": record["id"],
+            "query": record["query"],
+            "status": "error" if errors else "success",
+            "errors": errors,
+            "extracted": extracted,
+            "validated": validated
+        }
+
+    def extract_pack(self, records: List[Dict]) -> List[Dict]:
+        """
+        Extract one pack with a single LLM request. Queries the LLM left out of its answer are
+        retried one by one through FunctionCallingAgent.extract; queries that still fail are not
+        returned, so a resumed run picks them up again.
+        """
+        try:
+            llm_result = self.agent.client.call_llm(system_prompt=self.system_prompt, user_prompt=self.pack_prompt(records))
+        except LLMError as e:
+            print(f"Packed request of {len(records)} queries failed: {e}")
+            llm_result = None
+        unpacked = self.unpack(records, llm_result)
+
+        results = []
+        for index, record in enumerate(records):
+            extracted = unpacked.get(index)
+            if extracted is None:
+                try:
+                    extracted = self.agent.extract(record["query"])
+                except Exception as e:
+                    print(f"Extraction failed for query {record['id']}: {e}")
+                    continue
+            results.append(self.validate(record, extracted))
+        return results
+
+    def run(self, input_path: str, output_path: str) -> Dict:
+        """
+        Extract every query of input_path and append the results to output_path as JSONL.
+
+        Results are written as soon as their pack finishes, so the output file doubles as the
+        checkpoint: queries whose id is already in output_path are skipped, and an interrupted
+        run continues where it stopped.
+        Returns:
+            Dict with the number of written, skipped and failed queries and the elapsed seconds.
+        """
+        done = completed_ids(output_path)
+        pending = (record for record in read_queries(input_path) if record["id"] not in done)
+        packs = chunked(pending, self.pack_size)
+        stats = {"written": 0, "skipped": len(done), "failed": 0}
+        start = time.perf_counter()
+        last_report = 0.0
+
+        with open(output_path, 'a', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+
+            def submit_next() -> bool:
+                pack = next(packs, None)
+                if pack is None:
+                    return False
+                in_flight[executor.submit(self.extract_pack, pack)] = pack
+                return True
+
+            # Keep a bounded number of packs in flight instead of reading the whole file up front
+            for _ in range(self.max_workers * 2):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pack = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        print(f"Pack of {len(pack)} queries failed: {e}")
+                        results = []
+                    for result in results:
+                        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    stats["written"] += len(results)
+                    stats["failed"] += len(pack) - len(results)
+                    submit_next()
+
+                elapsed = time.perf_counter() - start
+                if elapsed - last_report >= 10 or not in_flight:
+                    last_report = elapsed
+                    print(f"{stats['written']} written, {stats['failed']} failed, "
+                          f"{stats['written'] / max(elapsed, 1e-9):.1f} queries/s")
+
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    def write_batch_requests(self, input_path: str, requests_path: str, output_path: Optional[str] = None) -> int:
+        """
+        Write the pending queries as an OpenAI Batch API input file, one packed request per line.
+        The queries of each request are kept in a manifest next to it (requests_path + ".manifest")
+        so the batch output can be matched back to query ids.
+        Args:
+            input_path: Query JSONL.
+            requests_path: Batch input JSONL to write.
+            output_path: Result JSONL; queries already in it are left out.
+        Returns:
+            Number of requests written.
+        """
+        done = completed_ids(output_path) if output_path else set()
+        pending = (record for record in read_queries(input_path) if record["id"] not in done)
+        count = 0
+        with open(requests_path, 'w', encoding='utf-8') as requests_file, \
+                open(requests_path + ".manifest", 'w', encoding='utf-8') as manifest_file:
+            for count, pack in enumerate(chunked(pending, self.pack_size), start=1):
+                custom_id = f"pack-{count}"
+                request = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": self.agent.client.model,
+                        "messages": self.messages(pack),
+                        "response_format": {"type": "json_object"}
+                    }
+                }
+                requests_file.write(json.dumps(request, ensure_ascii=False) + "\n")
+                manifest_file.write(json.dumps({"custom_id": custom_id, "records": pack}, ensure_ascii=False) + "\n")
+        return count
+
+    def replay_batch(self, requests_path: str, batch_output_path: str) -> int:
+        """
+        Local stand-in for the Batch API: send every request of a batch input file through the
+        agent's LLM client and write the responses in the Batch API output format. Requests whose
+        custom_id is already in batch_output_path are skipped.
+        Returns:
+            Number of requests sent.
+        """
+        done = set()
+        if os.path.exists(batch_output_path):
+            with open(batch_output_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        done.add(json.loads(line)["custom_id"])
+                    except (ValueError, KeyError):
+                        continue
+
+        with open(requests_path, 'r', encoding='utf-8') as f:
+            requests = [request for request in map(json.loads, f) if request["custom_id"] not in done]
+
+        def send(request: Dict) -> Dict:
+            try:
+                response = self.agent.client.client.chat.completions.create(**request["body"])
+                return {
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": response.model_dump()},
+                    "error": None
+                }
+            except Exception as e:
+                return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+
+        sent = 0
+        with open(batch_output_path, 'a', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for line in executor.map(send, requests):
+                # Failed requests are not written, so they are sent again on the next replay
+                if line["error"] is None:
+                    out.write(json.dumps(line, ensure_ascii=False) + "\n")
+                    out.flush()
+                    sent += 1
+                else:
+                    print(f"Batch request {line['custom_id']} failed: {line['error']['message']}")
+        return sent
+
+    def collect_batch(self, requests_path: str, batch_output_path: str, output_path: str) -> Dict:
+        """
+        Validate the responses of a (real or replayed) batch job and append them to output_path.
+        Queries missing from a response are extracted one by one, as in extract_pack.
+        """
+        with open(requests_path + ".manifest", 'r', encoding='utf-8') as f:
+            manifest = {entry["custom_id"]: entry["records"] for entry in map(json.loads, f)}
+        done = completed_ids(output_path)
+        stats = {"written": 0, "skipped": 0, "failed": 0}
+
+        with open(batch_output_path, 'r', encoding='utf-8') as f, open(output_path, 'a', encoding='utf-8') as out:
+            for line in f:
+                response = json.loads(line)
+                pack = manifest.get(response["custom_id"], [])
+                remaining = sum(record["id"] not in done for record in pack)
+                stats["skipped"] += len(pack) - remaining
+                if not remaining:
+                    continue
+                try:
+                    content = response["response"]["body"]["choices"][0]["message"]["content"]
+                    llm_result = json.loads(content)
+                except (TypeError, KeyError, IndexError, ValueError):
+                    llm_result = None
+                # Indices refer to the full pack, finished records are skipped after unpacking
+                unpacked = self.unpack(pack, llm_result)
+                for index, record in enumerate(pack):
+                    if record["id"] in done:
+                        continue
+                    extracted = unpacked.get(index)
+                    if extracted is None:
+                        try:
+                            extracted = self.agent.extract(record["query"])
+                        except Exception as e:
+                            print(f"Extraction failed for query {record['id']}: {e}")
+                            stats["failed"] += 1
+                            continue
+                    out.write(json.dumps(self.validate(record, extracted), ensure_ascii=False) + "\n")
+                    done.add(record["id"])
+                    stats["written"] += 1
+                out.flush()
+        return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk LLM extraction of a JSONL query file.")
+    parser.add_argument("input", help="JSONL with one {\"id\", \"query\"} object (or JSON string) per line")
+    parser.add_argument("output", help="JSONL to append validated results to; also the resume checkpoint")
+    parser.add_argument("--mode", choices=["packed", "batch"], default="packed",
+                        help="packed: concurrent packed requests; batch: Batch API input file replayed locally")
+    parser.add_argument("--pack-size", type=int, default=10, help="Queries per LLM request")
+    parser.add_argument("--workers", type=int, default=4, help="LLM requests in flight")
+    parser.add_argument("--requests", help="Batch input JSONL (batch mode, default: <output>.requests.jsonl)")
+    parser.add_argument("--write-only", action="store_true",
+                        help="Batch mode: only write the batch input file, e.g. to upload it to the Batch API")
+    parser.add_argument("--single-call", action="store_true", help="Extract the Google place type directly")
+    args = parser.parse_args(argv)
+
+    extractor = BatchExtractor(
+        agent=FunctionCallingAgent(single_call=args.single_call),
+        pack_size=args.pack_size,
+        max_workers=args.workers
+    )
+
+    if args.mode == "packed":
+        print(extractor.run(args.input, args.output))
+        return
+
+    requests_path = args.requests or args.output + ".requests.jsonl"
+    batch_output_path = requests_path + ".output.jsonl"
+    if not os.path.exists(requests_path):
+        print(f"Wrote {extractor.write_batch_requests(args.input, requests_path, args.output)} requests to {requests_path}")
+    if args.write_only:
+        return
+    print(f"Replayed {extractor.replay_batch(requests_path, batch_output_path)} requests")
+    print(extractor.collect_batch(requests_path, batch_output_path, args.output))
+
+
+if __name__ == '__main__':
+    main()
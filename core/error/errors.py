@@ -6,3 +6,6 @@ class LocationError(Exception):
 
 class StarRequirementError(Exception):
     pass
+
+class LLMError(Exception):
+    pass
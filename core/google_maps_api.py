@@ -3,47 +3,176 @@ from datetime import datetime
 from dotenv import load_dotenv
 import os
 from core.help_functions.detecting_location import disambiguate_location
+from core.help_functions.response_cache import ResponseCache, quantize_location
+from core.help_functions.geo import MAX_SPEEDS_MPS, search_radius, prefilter_reachable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import asyncio
+import random
 import time
  
 load_dotenv()
 gmaps = googlemaps.Client(key=os.getenv('GOOGLE_MAPS_API_KEY'))
+# Shared response cache; set MAPS_CACHE_PATH to also persist responses in SQLite
+response_cache = ResponseCache(path=os.getenv('MAPS_CACHE_PATH'))
+
+# Element statuses that are a real answer from the API and safe to cache
+CACHEABLE_ELEMENT_STATUSES = {'OK', 'ZERO_RESULTS', 'NOT_FOUND'}
  
-def get_travel_time(origin, destinations, travel_mode='walking', chunk_size=25):
+def get_travel_time(origin, destinations, travel_mode='walking', chunk_size=25, client=None, max_workers=4, retries=2):
     """Calculate travel time from origin to multiple destinations in chunks for the specified mode."""
+    return get_travel_time_matrix(
+        [origin],
+        destinations,
+        travel_mode=travel_mode,
+        max_dimension=chunk_size,
+        client=client,
+        max_workers=max_workers,
+        retries=retries
+    )[0]
+
+def get_travel_time_matrix(origins, destinations, travel_mode='walking', max_dimension=25, max_elements=100,
+                           client=None, max_workers=4, retries=2):
+    """
+    Travel times (seconds) from every origin to every destination, e.g. for a batch of user queries
+    in the same area sharing one candidate list.
+
+    Cached elements are reused and the misses are tiled into distance-matrix requests of at most
+    max_dimension origins, max_dimension destinations and max_elements elements (100 on the
+    standard plan; 25x25 = 625 where the plan allows it). Tiles are requested concurrently and
+    reassembled in order; a failed tile is retried on its own with backoff.
+
+    Args:
+        origins: List of (lat, lng) tuples or addresses
+        destinations: List of (lat, lng) tuples or addresses
+        travel_mode: 'walking', 'driving', 'transit' or 'bicycling'
+        max_dimension: Maximum origins and destinations per request
+        max_elements: Maximum origins x destinations per request
+        client: googlemaps.Client (or a compatible fake); defaults to the module client
+        max_workers: Maximum number of requests in flight at once
+        retries: Extra attempts for a failed request before its elements are set to inf
+
+    Returns:
+        List with one row per origin of travel times in the order of destinations; inf where no route was found
+    """
+    client = client or gmaps
     valid_modes = ['walking', 'driving', 'transit', 'bicycling']
     if travel_mode.lower() not in valid_modes:
         raise ValueError(f"Invalid travel mode: {travel_mode}. Must be one of {valid_modes}.")
-   
-    times = []
-    for i in range(0, len(destinations), chunk_size):
-        chunk = destinations[i:i+chunk_size]
+    travel_mode = travel_mode.lower()
+
+    # Elements are cached per (quantized origin, destination, mode), only misses go to the API
+    destination_keys = [quantize_location(destination, precision=6) for destination in destinations]
+    times = [[None] * len(destinations) for _ in origins]
+    keys = {}
+    missing_origins = []
+    missing_destinations = set()
+    for o, origin in enumerate(origins):
+        origin_key = response_cache.quantize(origin)
+        for d, destination_key in enumerate(destination_keys):
+            key = response_cache.make_key('distance_matrix', origin=origin_key, destination=destination_key, mode=travel_mode)
+            element = response_cache.get('distance_matrix', key)
+            if element is None:
+                keys[o, d] = key
+                if not missing_origins or missing_origins[-1] != o:
+                    missing_origins.append(o)
+                missing_destinations.add(d)
+            else:
+                times[o][d] = _element_travel_time(element)
+    missing_destinations = sorted(missing_destinations)
+
+    tiles = _matrix_tiles(missing_origins, missing_destinations, max_dimension, max_elements)
+    saved_requests = len(_matrix_tiles(range(len(origins)), range(len(destinations)), max_dimension, max_elements)) - len(tiles)
+    if saved_requests > 0:
+        response_cache.record_saved_calls('distance_matrix', saved_requests)
+
+    def request(tile):
+        tile_origins, tile_destinations = tile
+        return _distance_matrix_with_retry(
+            client,
+            [origins[o] for o in tile_origins],
+            [destinations[d] for d in tile_destinations],
+            travel_mode,
+            retries
+        )
+
+    if tiles:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tiles))) as executor:
+            futures = [executor.submit(request, tile) for tile in tiles]
+            # Results are written back by tile position, so completion order does not matter
+            for number, ((tile_origins, tile_destinations), future) in enumerate(zip(tiles, futures), start=1):
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    print(f"Error calculating travel time for chunk {number}: {e}")
+                    rows = None
+                for row_index, o in enumerate(tile_origins):
+                    for column_index, d in enumerate(tile_destinations):
+                        if times[o][d] is not None:
+                            continue
+                        if rows is None:
+                            times[o][d] = float('inf')
+                            continue
+                        element = rows[row_index]['elements'][column_index]
+                        times[o][d] = _element_travel_time(element)
+                        if element['status'] in CACHEABLE_ELEMENT_STATUSES:
+                            response_cache.set('distance_matrix', keys[o, d], element)
+    return times
+
+def _matrix_tiles(origin_indices, destination_indices, max_dimension, max_elements):
+    """Split origins x destinations into request-sized blocks of (origin indices, destination indices)."""
+    origin_indices = list(origin_indices)
+    destination_indices = list(destination_indices)
+    if not origin_indices or not destination_indices:
+        return []
+    destination_block = min(max_dimension, max_elements, len(destination_indices))
+    origin_block = max(1, min(max_dimension, max_elements // destination_block))
+    return [
+        (origin_indices[i:i + origin_block], destination_indices[j:j + destination_block])
+        for i in range(0, len(origin_indices), origin_block)
+        for j in range(0, len(destination_indices), destination_block)
+    ]
+
+def _distance_matrix_with_retry(client, origins, destinations, travel_mode, retries, backoff=0.5):
+    """One distance-matrix request, retried with jittered exponential backoff on transient errors."""
+    for attempt in range(retries + 1):
         try:
-            result = gmaps.distance_matrix(
-                origins=[origin],
-                destinations=chunk,
-                mode=travel_mode.lower(),
+            result = client.distance_matrix(
+                origins=origins,
+                destinations=destinations,
+                mode=travel_mode,
                 units='metric'
             )
-            for element in result['rows'][0]['elements']:
-                if element['status'] == 'OK':
-                    times.append(element['duration']['value'])  # Time in seconds
-                else:
-                    times.append(float('inf'))  # Handle cases where no route is found
+            rows = result['rows']
+            if len(rows) != len(origins) or any(len(row['elements']) != len(destinations) for row in rows):
+                raise ValueError(f"Unexpected distance matrix shape for {len(origins)}x{len(destinations)} request")
+            return rows
         except Exception as e:
-            print(f"Error calculating travel time for chunk {i // chunk_size + 1}: {e}")
-            times.extend([float('inf')] * len(chunk))
-    return times
+            # Invalid requests fail the same way every time
+            retryable = not isinstance(e, googlemaps.exceptions.ApiError) or e.status in ('UNKNOWN_ERROR', 'OVER_QUERY_LIMIT')
+            if attempt == retries or not retryable:
+                raise
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+def _element_travel_time(element):
+    if element['status'] == 'OK':
+        return element['duration']['value']  # Time in seconds
+    return float('inf')  # Handle cases where no route is found
  
-def get_place_details(place_id):
+def get_place_details(place_id, client=None):
     """Fetch detailed information for a place using its place_id, sorting reviews by recency."""
+    client = client or gmaps
     try:
-        details = gmaps.place(
-            place_id=place_id,
-            fields=[
-                'name', 'formatted_address', 'rating', 'reviews',
-                'formatted_phone_number', 'website', 'opening_hours', 'geometry/location',
-                'price_level'
-            ]
+        details = response_cache.get_or_call(
+            'place',
+            response_cache.make_key('place', place_id=place_id),
+            lambda: client.place(
+                place_id=place_id,
+                fields=[
+                    'name', 'formatted_address', 'rating', 'reviews',
+                    'formatted_phone_number', 'website', 'opening_hours', 'geometry/location',
+                    'price_level'
+                ]
+            )
         )
         result = details.get('result', {})
         reviews = result.get('reviews', [])
@@ -56,6 +185,7 @@ def get_place_details(place_id):
         )[:5]  # Ensure max 5 reviews
        
         return {
+            'place_id': place_id,
             'name': result.get('name'),
             'address': result.get('formatted_address'),
             'rating': result.get('rating', 0),
@@ -81,7 +211,309 @@ def get_place_details(place_id):
     except Exception as e:
         print(f"Error fetching details for place_id {place_id}: {e}")
         return None
- 
+
+def iter_places_nearby(
+    location,
+    radius,
+    place_type,
+    keyword=None,
+    open_now=True,
+    max_pages=3,
+    poll_delay=0.25,
+    max_poll_delay=1.0,
+    poll_timeout=8.0,
+    client=None,
+):
+    """
+    Yield places_nearby results page by page ({'place_id', 'location'} dicts per page).
+
+    A next_page_token only becomes valid a short while after it is issued. Instead of sleeping a
+    fixed 2 s, the next page is requested right away and re-polled with exponential backoff while
+    the API still answers INVALID_REQUEST. Because this is a generator, the caller can work on a
+    page while the next one is pending, and stop early by not asking for more.
+
+    Pages are cached one by one. The next_page_token of a cached page may have expired long
+    ago, so it is tried once without polling; if it is dead, the earlier pages are requested
+    again (refreshing their cache entries) for a fresh token.
+
+    Args:
+        location: Tuple of (latitude, longitude)
+        radius: Search radius in meters
+        place_type: Google place type
+        keyword: Optional keyword filter
+        open_now: If True, only return places currently open
+        max_pages: Maximum pages to fetch (the API serves at most 3 of 20 results)
+        poll_delay: First wait before re-polling a page token that is not valid yet
+        max_poll_delay: Upper bound of a single wait
+        poll_timeout: Seconds to keep polling one token before giving up on further pages
+        client: googlemaps.Client (or a compatible fake); defaults to the module client
+    """
+    client = client or gmaps
+    request = {
+        'location': location,
+        'radius': radius,
+        'type': place_type,
+        'keyword': keyword,
+        'open_now': open_now,
+    }
+    polling = (poll_delay, max_poll_delay, poll_timeout)
+
+    def cache_key(page):
+        return response_cache.make_key(
+            'places_nearby',
+            location=response_cache.quantize(location),
+            radius=radius,
+            type=place_type,
+            keyword=keyword,
+            open_now=open_now,
+            page=page
+        )
+
+    next_page_token = None
+    token_from_cache = False
+    for page in range(max_pages):
+        response = response_cache.get('places_nearby', cache_key(page))
+        if response is not None:
+            response_cache.record_saved_calls('places_nearby')
+            from_cache = True
+        else:
+            try:
+                if token_from_cache:
+                    response = _places_nearby_after_cached_page(client, request, next_page_token, page, cache_key, polling)
+                else:
+                    response = _places_nearby_page(client, request, next_page_token, *polling)
+            except Exception as e:
+                print(f"Error fetching places: {e}")
+                return
+            response_cache.set('places_nearby', cache_key(page), response)
+            from_cache = False
+
+        yield [
+            {
+                'place_id': place.get('place_id'),
+                'location': (
+                    place['geometry']['location']['lat'],
+                    place['geometry']['location']['lng']
+                )
+            }
+            for place in response.get('results', [])
+        ]
+
+        next_page_token = response.get('next_page_token')
+        token_from_cache = from_cache
+        if not next_page_token:
+            return
+
+def _places_nearby_after_cached_page(client, request, page_token, page, cache_key, polling):
+    """
+    Page `page` of a query whose previous page came from the cache: its token is tried once, and
+    if it has expired, pages 0 .. page - 1 are fetched again for a fresh token.
+    """
+    try:
+        return client.places_nearby(page_token=page_token, **request)
+    except googlemaps.exceptions.ApiError as e:
+        if e.status != 'INVALID_REQUEST':
+            raise
+    page_token = None
+    for earlier in range(page):
+        response = _places_nearby_page(client, request, page_token, *polling)
+        response_cache.set('places_nearby', cache_key(earlier), response)
+        page_token = response.get('next_page_token')
+        if not page_token:
+            # The result set shrank since the cached pages were stored
+            return {'results': []}
+    return _places_nearby_page(client, request, page_token, *polling)
+
+def _places_nearby_page(client, request, page_token, poll_delay, max_poll_delay, poll_timeout):
+    """One places_nearby page, polling while its page token is not valid yet."""
+    if page_token is None:
+        return client.places_nearby(**request)
+
+    deadline = time.monotonic() + poll_timeout
+    delay = poll_delay
+    while True:
+        try:
+            return client.places_nearby(page_token=page_token, **request)
+        except googlemaps.exceptions.ApiError as e:
+            # INVALID_REQUEST is what a token that is not active yet returns
+            if e.status != 'INVALID_REQUEST' or time.monotonic() + delay > deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * 2, max_poll_delay)
+
+def iter_places_within_travel_distance(
+    location,
+    minimum_star_requirement=3.5,
+    place_type='restaurant',
+    travel_mode='walking',
+    max_travel_time=900,
+    open_now=True,
+    max_workers=8,
+    details_timeout=10,
+    max_candidates=None,
+    max_results=None,
+    client=None,
+):
+    """
+    Streaming find_places_within_travel_distance: yield each qualifying place as soon as its travel
+    time and details are known, instead of after every page, matrix chunk and detail fetch.
+
+    Page requests, distance-matrix calls and detail fetches all run on one worker pool: page 1's
+    travel times and details are fetched while page 2 is still pending, and details are yielded in
+    completion order. Closing the generator early cancels the work that has not started yet.
+
+    Args: as find_places_within_travel_distance.
+
+    Yields:
+        Place detail dicts with 'travel_time' (minutes) and 'travel_mode' added
+    """
+    places = _iter_places_within_travel_distance(location, minimum_star_requirement, place_type, travel_mode,
+                                                 max_travel_time, open_now, max_workers, details_timeout,
+                                                 max_candidates, max_results, client)
+    try:
+        for _, place in places:
+            yield place
+    finally:
+        places.close()
+
+def _iter_places_within_travel_distance(location, minimum_star_requirement, place_type, travel_mode, max_travel_time,
+                                        open_now, max_workers, details_timeout, max_candidates, max_results, client):
+    """iter_places_within_travel_distance yielding (position in the places_nearby results, place)."""
+    client = client or gmaps
+    if travel_mode.lower() not in MAX_SPEEDS_MPS:
+        raise ValueError(f"Invalid travel mode: {travel_mode}. Must be one of {list(MAX_SPEEDS_MPS)}.")
+
+    # Convert address to coordinates if necessary
+    if isinstance(location, str):
+        geocode = client.geocode(location)
+        if not geocode:
+            print("Invalid location")
+            return
+        location = (geocode[0]['geometry']['location']['lat'],
+                    geocode[0]['geometry']['location']['lng'])
+
+    # Build keyword for filtering
+    keywords = []
+
+    keyword = ' '.join(keywords) if keywords else None
+
+    # Set radius
+    radius = search_radius(travel_mode, max_travel_time)
+    pages = iter_places_nearby(location, radius, place_type, keyword=keyword, open_now=open_now, client=client)
+
+    def travel_times(candidates):
+        # Straight-line pre-filter: places out of reach even at the mode's top speed never reach the
+        # distance matrix, and the rest are resolved closest first
+        order, _ = prefilter_reachable(location, [place['location'] for _, place in candidates], travel_mode, max_travel_time)
+        if len(order) < len(candidates):
+            print(f"Pre-filter dropped {len(candidates) - len(order)} of {len(candidates)} places out of reach")
+        candidates = [candidates[index] for index in order]
+        if not candidates:
+            return []
+        times = get_travel_time(location, [place['location'] for _, place in candidates], travel_mode=travel_mode, client=client)
+        return [(position, place, travel_time) for (position, place), travel_time in zip(candidates, times)
+                if travel_time <= max_travel_time]
+
+    started = {}
+
+    def details(position, place, travel_time):
+        started[place['place_id']] = time.monotonic()
+        return position, get_place_details(place['place_id'], client=client), travel_time
+
+    executor = ThreadPoolExecutor(max_workers=max_workers + 2)
+    # future -> (kind, argument); kinds: 'page', 'travel', 'details'
+    tasks = {executor.submit(next, pages, None): ('page', None)}
+    candidates = 0
+    yielded = 0
+    paging = True
+    try:
+        while tasks:
+            deadlines = [
+                started[argument] + details_timeout for future, (kind, argument) in tasks.items()
+                if kind == 'details' and argument in started
+            ]
+            wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(tasks, timeout=wait_time, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                kind, argument = tasks.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error fetching places ({kind}): {e}")
+                    continue
+
+                if kind == 'page':
+                    page = result
+                    if page is None or not paging:
+                        paging = False
+                        continue
+                    if max_candidates is not None:
+                        page = page[:max_candidates - candidates]
+                    candidates += len(page)
+                    if page:
+                        # Positions in the places_nearby results, which come in prominence order
+                        tasks[executor.submit(travel_times, list(enumerate(page, start=candidates - len(page))))] = ('travel', None)
+                    if max_candidates is not None and candidates >= max_candidates:
+                        paging = False
+                    if paging:
+                        tasks[executor.submit(next, pages, None)] = ('page', None)
+
+                elif kind == 'travel':
+                    for position, place, travel_time in result:
+                        tasks[executor.submit(details, position, place, travel_time)] = ('details', place['place_id'])
+
+                else:
+                    position, place_details, travel_time = result
+                    if place_details and place_details['rating'] >= minimum_star_requirement:
+                        place_details['travel_time'] = round(travel_time / 60, 1)
+                        place_details['travel_mode'] = travel_mode.lower()
+                        yielded += 1
+                        if max_results is not None and yielded >= max_results:
+                            # Enough places passed the filters: don't request further pages
+                            paging = False
+                        yield position, place_details
+
+            now = time.monotonic()
+            for future, (kind, argument) in list(tasks.items()):
+                if kind == 'details' and argument in started and now - started[argument] >= details_timeout:
+                    print(f"Timed out fetching details for place_id {argument} after {details_timeout}s")
+                    del tasks[future]
+
+            if not paging:
+                for future, (kind, _) in list(tasks.items()):
+                    if kind == 'page' and future.cancel():
+                        del tasks[future]
+    finally:
+        # Don't block on requests we have given up on
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def aiter_places_within_travel_distance(**kwargs):
+    """
+    Async iterator over iter_places_within_travel_distance for callers on an event loop:
+    async for place in aiter_places_within_travel_distance(location=..., place_type=...): ...
+
+    The generator is advanced on a worker thread. If the consumer stops or is cancelled while a
+    next() is still running there, the generator is closed once that call returns, since a running
+    generator cannot be closed.
+    """
+    iterator = iter_places_within_travel_distance(**kwargs)
+    worker = ThreadPoolExecutor(max_workers=1)
+    future = None
+    try:
+        while True:
+            future = worker.submit(next, iterator, None)
+            place = await asyncio.wrap_future(future)
+            if place is None:
+                return
+            yield place
+    finally:
+        if future is not None and not future.done():
+            future.add_done_callback(lambda _: iterator.close())
+        else:
+            iterator.close()
+        worker.shutdown(wait=False)
+
 def find_places_within_travel_distance(
     location,
     minimum_star_requirement=3.5,
@@ -89,6 +521,11 @@ def find_places_within_travel_distance(
     travel_mode='walking',
     max_travel_time=900,
     open_now=True,
+    max_workers=8,
+    details_timeout=10,
+    max_candidates=None,
+    max_results=None,
+    client=None,
 ):
     """
     Find places within a specified travel time from a location, with filters for cuisine, price, Wi-Fi, and open status.
@@ -103,87 +540,21 @@ def find_places_within_travel_distance(
         price_level: 'cheap' (0-1), 'moderate' (2), 'expensive' (3-4), or None
         free_wifi: If True, search for places with 'free Wi-Fi' in description/reviews
         open_now: If True, only return places currently open
+        max_workers: Maximum number of concurrent place-detail requests
+        details_timeout: Seconds a single place-detail request may take
+        max_candidates: Maximum number of places_nearby results to consider (None: all pages)
+        max_results: Stop requesting further pages once this many places passed the filters
+        client: googlemaps.Client (or a compatible fake); defaults to the module client
    
     Returns:
-        List of places with detailed information
+        List of places with detailed information, in the order places_nearby returned them
     """
-    # Convert address to coordinates if necessary
-    if isinstance(location, str):
-        geocode = gmaps.geocode(location)
-        if not geocode:
-            print("Invalid location")
-            return []
-        location = (geocode[0]['geometry']['location']['lat'],
-                    geocode[0]['geometry']['location']['lng'])
-
- 
-    # Build keyword for filtering
-    keywords = []
-
-    keyword = ' '.join(keywords) if keywords else None
- 
-    places = []
-    next_page_token = None
-    
-    # Set radius
-    if travel_mode == 'walking':
-        radius = 1.39*max_travel_time
-    elif travel_mode == 'driving':
-        radius = 16*max_travel_time
-    if travel_mode == 'transit':
-        radius = 9*max_travel_time
-    if travel_mode == 'bicycling':
-        radius = 5*max_travel_time
-    
-    # Handle pagination (up to 60 results)
-    for _ in range(3):  # Max 3 pages (20 results each)
-        try:
-            response = gmaps.places_nearby(
-                location=location,
-                radius=radius,
-                type=place_type,
-                keyword=keyword,
-                open_now=open_now,
-                page_token=next_page_token
-            )
- 
-            for place in response.get('results', []):
-                places.append({
-                    'place_id': place.get('place_id'),
-                    'location': (
-                        place['geometry']['location']['lat'],
-                        place['geometry']['location']['lng']
-                    )
-                })
- 
-            next_page_token = response.get('next_page_token')
-            if not next_page_token:
-                break
- 
-            time.sleep(2)
- 
-        except Exception as e:
-            print(f"Error fetching places: {e}")
-            break
-
-    # Filter places by travel time
-    filtered_places = []
-    if places:
-        destinations = [place['location'] for place in places]
-        travel_times = get_travel_time(location, destinations, travel_mode=travel_mode)
-
-        for place, travel_time in zip(places, travel_times):
-            # print(place)
-            # print(travel_time)
-            # print(max_travel_time)
-            if travel_time <= max_travel_time:
-                details = get_place_details(place['place_id'])
-                if details and details['rating'] >= minimum_star_requirement:
-                    details['travel_time'] = round(travel_time / 60, 1)
-                    details['travel_mode'] = travel_mode.lower()
-                    filtered_places.append(details)
-
-    return filtered_places
+    # The stream yields places as their details arrive; restore the order of the search results
+    places = sorted(_iter_places_within_travel_distance(location, minimum_star_requirement, place_type, travel_mode,
+                                                        max_travel_time, open_now, max_workers, details_timeout,
+                                                        max_candidates, max_results, client),
+                    key=lambda item: item[0])
+    return [place for _, place in places]
  
 # Example usage
 if __name__ == "__main__":
@@ -1,22 +1,263 @@
+from core.error.errors import LLMError
+
 import openai
+import httpx
+from collections import deque
+from typing import Dict, List, Optional
+import contextvars
+import itertools
+import threading
+import asyncio
+import random
+import time
 import os
 import json
 
-class LLMClient:
-    def __init__(self, api_key=None, model="gpt-4o-mini"):
+# Errors worth retrying: the request may succeed when sent again
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+# Last call per client, per thread / asyncio task, so concurrent callers each see their own.
+# Maps client number -> call; a new dict is set on every update, so contexts never share one.
+_last_calls = contextvars.ContextVar("llm_last_calls", default={})
+_client_numbers = itertools.count()
+
+
+def get_http_client(max_connections: int = 20, timeout: float = 60.0) -> httpx.Client:
+    """
+    Process-wide HTTP client shared by every LLMClient, so connections (and their TLS sessions)
+    are kept alive and reused across calls instead of being opened per client.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = openai.DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                    timeout=timeout,
+                )
+    return _http_client
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Rough prompt size (about 4 characters per token) for rate limiting before the real count is known."""
+    return sum(len(message["content"]) // 4 + 4 for message in messages)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
         """
-        Initializes the LLMClient.
+        Token buckets for the provider's requests-per-minute and tokens-per-minute limits.
+
+        A caller reserves capacity before sending and waits for the returned delay; buckets may go
+        negative, which makes later callers wait longer, so concurrent callers are spaced out without
+        holding a lock while sleeping. None disables a limit.
+        """
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.available = {name: limit for name, limit in self.limits.items() if limit}
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        for name in self.available:
+            limit = self.limits[name]
+            self.available[name] = min(limit, self.available[name] + elapsed * limit / 60.0)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Take one request and `tokens` tokens; returns the seconds to wait before sending."""
+        with self._lock:
+            self._refill(time.monotonic())
+            delay = 0.0
+            for name, amount in (("requests", 1), ("tokens", tokens)):
+                if name not in self.available:
+                    continue
+                self.available[name] -= amount
+                if self.available[name] < 0:
+                    delay = max(delay, -self.available[name] * 60.0 / self.limits[name])
+            return delay
+
+    def adjust(self, tokens: int):
+        """Correct a reservation once the real token usage is known (positive: more were used)."""
+        with self._lock:
+            if "tokens" in self.available:
+                self.available["tokens"] -= tokens
+
+    def acquire(self, tokens: int = 0):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
 
+    async def acquire_async(self, tokens: int = 0):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _BaseLLMClient:
+    def __init__(
+        self,
+        api_key=None,
+        model="gpt-4o-mini",
+        base_url=None,
+        max_retries=4,
+        backoff_base=0.5,
+        backoff_max=20.0,
+        rate_limiter=None,
+        history_size=1000,
+    ):
+        """
         Args:
             api_key (str): Your OpenAI API key. If None, reads from OPENAI_API_KEY env var.
             model (str): The OpenAI model to use (default is 'gpt-4o-mini').
+            base_url (str): OpenAI-compatible endpoint, e.g. a local mock server. If None, reads
+                OPENAI_BASE_URL or uses the OpenAI API.
+            max_retries (int): Retries of a failed call (connection errors, timeouts, 429 and 5xx).
+            backoff_base (float): Retry n waits a random time up to backoff_base * 2**n seconds.
+            backoff_max (float): Upper bound of a single retry wait.
+            rate_limiter (RateLimiter): Shared limiter for request and token limits (optional).
+            history_size (int): Number of recent calls kept for stats().
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("API key is required. Set OPENAI_API_KEY env var or pass api_key argument.")
-        
-        self.client = openai.OpenAI(api_key=self.api_key)
+
         self.model = model
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+        self.calls = deque(maxlen=history_size)
+        self._number = next(_client_numbers)
+        self._stats_lock = threading.Lock()
+
+    def _messages(self, system_prompt, user_prompt) -> List[Dict]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _request(self, messages: List[Dict]) -> Dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "response_format": {"type": "json_object"}
+        }
+
+    def _retry_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """Seconds to wait before retry `attempt`, or None if the error should not be retried."""
+        if attempt >= self.max_retries or not isinstance(error, RETRYABLE_ERRORS):
+            return None
+        # Honour the server's Retry-After on 429/503, otherwise full-jitter exponential backoff
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return min(float(retry_after), self.backoff_max)
+        except (TypeError, ValueError):
+            return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _parse(self, response, estimated_tokens: int, started: float, attempts: int) -> Dict:
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        call = {
+            "latency_seconds": time.perf_counter() - started,
+            "attempts": attempts,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": getattr(details, "cached_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "total_tokens": getattr(usage, "total_tokens", None),
+            "error": None,
+        }
+        if self.rate_limiter is not None and call["total_tokens"] is not None:
+            self.rate_limiter.adjust(call["total_tokens"] - estimated_tokens)
+
+        try:
+            result = json.loads(response.choices[0].message.content)
+        except (ValueError, TypeError, IndexError, AttributeError) as e:
+            call["error"] = f"Invalid JSON response: {e}"
+            self._record(call)
+            raise LLMError(call["error"]) from e
+        self._record(call)
+        return result
+
+    def _failed(self, error: Exception, started: float, attempts: int):
+        self._record({
+            "latency_seconds": time.perf_counter() - started,
+            "attempts": attempts,
+            "prompt_tokens": None,
+            "cached_tokens": None,
+            "completion_tokens": None,
+            "total_tokens": None,
+            "error": str(error),
+        })
+        print(f"Error communicating with OpenAI API: {error}")
+        raise LLMError(f"LLM call failed after {attempts} attempt(s): {error}") from error
+
+    def _record(self, call: Dict):
+        with self._stats_lock:
+            self.calls.append(call)
+        _last_calls.set({**_last_calls.get(), self._number: call})
+
+    @property
+    def last_call(self) -> Optional[Dict]:
+        """Latency, attempts and token usage of the most recent call made by the current thread or task."""
+        return _last_calls.get().get(self._number)
+
+    def stats(self) -> Dict:
+        """Call count, errors, retries, latency (mean/p50/p95 seconds) and token totals of recent calls."""
+        with self._stats_lock:
+            calls = list(self.calls)
+        latencies = sorted(call["latency_seconds"] for call in calls)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+        def total(key):
+            return sum(call[key] or 0 for call in calls)
+
+        return {
+            "calls": len(calls),
+            "errors": sum(call["error"] is not None for call in calls),
+            "retries": sum(call["attempts"] - 1 for call in calls),
+            "mean_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_latency": percentile(0.5),
+            "p95_latency": percentile(0.95),
+            "prompt_tokens": total("prompt_tokens"),
+            "cached_tokens": total("cached_tokens"),
+            "completion_tokens": total("completion_tokens"),
+        }
+
+
+class LLMClient(_BaseLLMClient):
+    def __init__(self, api_key=None, model="gpt-4o-mini", http_client=None, **kwargs):
+        """
+        Initializes the LLMClient.
+
+        Args:
+            api_key (str): Your OpenAI API key. If None, reads from OPENAI_API_KEY env var.
+            model (str): The OpenAI model to use (default is 'gpt-4o-mini').
+            http_client (httpx.Client): HTTP client to send requests with; defaults to the
+                process-wide pooled client from get_http_client().
+            **kwargs: base_url, max_retries, backoff_base, backoff_max, rate_limiter, history_size.
+        """
+        super().__init__(api_key=api_key, model=model, **kwargs)
+        # Retries are handled here, with jitter and rate limiting, so the SDK's own are disabled
+        self.client = openai.OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=http_client or get_http_client(),
+            max_retries=0,
+        )
 
     def call_llm(self, system_prompt, user_prompt):
         """
@@ -27,21 +268,71 @@ class LLMClient:
             user_prompt (str): The user message.
 
         Returns:
-            str: The assistant's reply.
+            dict: The assistant's reply, parsed from JSON.
+
+        Raises:
+            LLMError: If the call still fails after retries or the reply is not valid JSON.
         """
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                response_format={"type": "json_object"}
-            )
-
-            return json.loads(response.choices[0].message.content)
-        except Exception as e:
-            print(f"Error communicating with OpenAI API: {e}")
-            return None
+        messages = self._messages(system_prompt, user_prompt)
+        estimated_tokens = estimate_tokens(messages)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self.client.chat.completions.create(**self._request(messages))
+                return self._parse(response, estimated_tokens, started, attempt + 1)
+            except openai.OpenAIError as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    self._failed(e, started, attempt + 1)
+                attempt += 1
+                time.sleep(delay)
+
+
+class AsyncLLMClient(_BaseLLMClient):
+    def __init__(self, api_key=None, model="gpt-4o-mini", http_client=None, max_connections=20, **kwargs):
+        """
+        asyncio variant of LLMClient with the same retries, rate limiting and stats.
+
+        Args:
+            api_key (str): Your OpenAI API key. If None, reads from OPENAI_API_KEY env var.
+            model (str): The OpenAI model to use (default is 'gpt-4o-mini').
+            http_client (httpx.AsyncClient): Async HTTP client; by default one pooled client per
+                AsyncLLMClient (async connections cannot be shared across event loops).
+            max_connections (int): Pool size of the default HTTP client.
+            **kwargs: base_url, max_retries, backoff_base, backoff_max, rate_limiter, history_size.
+        """
+        super().__init__(api_key=api_key, model=model, **kwargs)
+        self.client = openai.AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=http_client or openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=60.0,
+            ),
+            max_retries=0,
+        )
+
+    async def call_llm(self, system_prompt, user_prompt):
+        """Async LLMClient.call_llm; raises LLMError on failure."""
+        messages = self._messages(system_prompt, user_prompt)
+        estimated_tokens = estimate_tokens(messages)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(estimated_tokens)
+            try:
+                response = await self.client.chat.completions.create(**self._request(messages))
+                return self._parse(response, estimated_tokens, started, attempt + 1)
+            except openai.OpenAIError as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    self._failed(e, started, attempt + 1)
+                attempt += 1
+                await asyncio.sleep(delay)
 
+    async def close(self):
+        await self.client.close()
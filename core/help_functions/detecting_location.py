@@ -1,12 +1,82 @@
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
-from fuzzywuzzy import process, fuzz
+from core.help_functions.gazetteer import get_gazetteer, Gazetteer
+from core.help_functions.response_cache import ResponseCache
 from typing import Dict, List, Optional, Tuple
+import threading
 import time
 import json
+import os
 
-class LocationError(Exception):
-    pass
+from core.error.errors import LocationError
+
+# Geocoding results survive restarts so repeated place names never hit Nominatim twice
+geocode_cache = ResponseCache(path=os.getenv('GEOCODE_CACHE_PATH', 'lib/cache/geocode.sqlite3'))
+
+# Empty answers may be transient (rate limiting, outages), so they are only kept briefly
+EMPTY_GEOCODE_TTL = 600
+
+_geolocator = None
+_geolocator_lock = threading.Lock()
+
+def get_geolocator() -> Nominatim:
+    """Shared Nominatim client, created on first use."""
+    global _geolocator
+    if _geolocator is None:
+        with _geolocator_lock:
+            if _geolocator is None:
+                _geolocator = Nominatim(user_agent="place_recommendation_app")
+    return _geolocator
+
+def _geocode(query: str, max_results: int, retries: int, timeout: int) -> List[Dict]:
+    """
+    Geocode with Nominatim through the persistent cache.
+    Returns:
+        List of dicts with address, coordinates and raw type (empty if nothing was found).
+    """
+    cache_key = geocode_cache.make_key('geocode', query=query.strip().lower(), limit=max_results)
+    cached = geocode_cache.get('geocode', cache_key)
+    if cached is not None:
+        geocode_cache.record_saved_calls('geocode')
+        return cached
+
+    attempt = 0
+    while attempt <= retries:
+        try:
+            locations = get_geolocator().geocode(
+                query,
+                exactly_one=False,
+                limit=max_results,
+                timeout=timeout
+            )
+            break
+        except (GeocoderTimedOut, GeocoderUnavailable) as e:
+            attempt += 1
+            if attempt > retries:
+                raise LocationError(f"Geocoding failed after {retries} retries: {str(e)}")
+            time.sleep(1)  # Respect Nominatim rate limits
+
+    results = [
+        {
+            "address": loc.address,
+            "coordinates": [loc.latitude, loc.longitude],
+            "raw_type": loc.raw.get("type", "")
+        }
+        for loc in (locations or [])
+    ]
+    geocode_cache.set('geocode', cache_key, results, ttl=None if results else EMPTY_GEOCODE_TTL)
+    return results
+
+def _distance_km(coords_a: Tuple[float, float], coords_b: Tuple[float, float]) -> float:
+    from math import radians, sin, cos, sqrt, atan2
+    R = 6371  # Earth's radius in km
+    lat1, lon1 = coords_a
+    lat2, lon2 = coords_b
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return R * c  # Distance in km
 
 def disambiguate_location(
     query: str,
@@ -26,16 +96,6 @@ def disambiguate_location(
     Returns:
         Dict with type, value, coordinates, and options (if ambiguous), or raises LocationError.
     """
-    # Initialize geocoder
-    geolocator = Nominatim(user_agent="place_recommendation_app")
-
-    # Reference locations for fuzzy matching (can be database-driven)
-    reference_locations = [
-        {"name": "Paris", "type": "city", "country": "France", "coordinates": (48.8566, 2.3522)},
-        {"name": "New York City", "type": "city", "country": "USA", "coordinates": (40.7128, -74.0060)},
-    ]
-    aliases = {"The Big Apple": "New York City", "NYC": "New York City"}
-
     # Handle empty query
     if not query:
         return {"type": None, "value": None, "coordinates": None, "options": None}
@@ -52,20 +112,11 @@ def disambiguate_location(
         #     "options": None
         # }
 
-    # Check aliases
-    query = aliases.get(query.lower(), query)
+    # Offline gazetteer (cities, landmarks, aliases) before any network call
+    matches = get_gazetteer().match(query)
 
-    # Fuzzy matching
-    location_names = [loc["name"] for loc in reference_locations]
-    best_match = process.extractOne(
-        query,
-        location_names,
-        scorer=fuzz.token_set_ratio,
-        score_cutoff=80
-    )
-
-    if best_match:
-        matched_loc = next(loc for loc in reference_locations if loc["name"] == best_match[0])
+    if len(matches) == 1:
+        matched_loc = matches[0]
         result = {
             "type": matched_loc["type"],
             "value": matched_loc["name"],
@@ -74,61 +125,48 @@ def disambiguate_location(
         }
         return result
 
-    # Geocoding with retries
-    attempt = 0
-    while attempt <= retries:
-        try:
-            locations = geolocator.geocode(
-                query,
-                exactly_one=False,
-                limit=max_results,
-                timeout=timeout
-            )
-            break
-        except (GeocoderTimedOut, GeocoderUnavailable) as e:
-            attempt += 1
-            if attempt > retries:
-                raise LocationError(f"Geocoding failed after {retries} retries: {str(e)}")
-            time.sleep(1)  # Respect Nominatim rate limits
+    if matches:
+        # Same name for several places (e.g. "Springfield")
+        options = [
+            {
+                "type": loc["type"],
+                "value": Gazetteer.display_name(loc, qualified=True),
+                "coordinates": loc["coordinates"]
+            }
+            for loc in matches[:max_results]
+        ]
+    else:
+        # Geocoding with retries (cached)
+        locations = _geocode(query, max_results=max_results, retries=retries, timeout=timeout)
 
-    if not locations:
-        raise LocationError(f"No results found for '{query}'")
+        if not locations:
+            raise LocationError(f"No results found for '{query}'")
 
-    # Single result
-    if len(locations) == 1:
-        loc = locations[0]
-        loc_type = "city" if "city" in loc.raw.get("type", "") else "landmark"
-        result = {
-            "type": loc_type,
-            "value": loc.address,
-            "coordinates": (loc.latitude, loc.longitude),
-            "options": None
-        }
-        return result
+        # Single result
+        if len(locations) == 1:
+            loc = locations[0]
+            loc_type = "city" if "city" in loc["raw_type"] else "landmark"
+            result = {
+                "type": loc_type,
+                "value": loc["address"],
+                "coordinates": tuple(loc["coordinates"]),
+                "options": None
+            }
+            return result
 
-    # Multiple results: Prioritize by geolocation (if provided)
-    options = [
-        {
-            "type": "city" if "city" in loc.raw.get("type", "") else "landmark",
-            "value": loc.address,
-            "coordinates": (loc.latitude, loc.longitude)
-        }
-        for loc in locations
-    ]
+        # Multiple results
+        options = [
+            {
+                "type": "city" if "city" in loc["raw_type"] else "landmark",
+                "value": loc["address"],
+                "coordinates": tuple(loc["coordinates"])
+            }
+            for loc in locations
+        ]
 
+    # Prioritize by geolocation (if provided)
     if geolocation_coords:
-        def distance_to_user(option):
-            from math import radians, sin, cos, sqrt, atan2
-            R = 6371  # Earth's radius in km
-            lat1, lon1 = geolocation_coords
-            lat2, lon2 = option["coordinates"]
-            dlat = radians(lat2 - lat1)
-            dlon = radians(lon2 - lon1)
-            a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-            c = 2 * atan2(sqrt(a), sqrt(1 - a))
-            return R * c  # Distance in km
-
-        options.sort(key=distance_to_user)
+        options.sort(key=lambda option: _distance_km(geolocation_coords, option["coordinates"]))
 
     return {
         "type": None,
@@ -0,0 +1,141 @@
+from fuzzywuzzy import fuzz
+from core.help_functions.location_index import LocationIndex
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
+import os
+
+# GeoNames feature class -> the location types disambiguate_location returns
+FEATURE_CLASS_TYPES = {"P": "city", "A": "country"}
+
+
+class Gazetteer:
+    def __init__(self, records: List[Dict]):
+        """
+        Offline index of known places for resolving common locations without a network call.
+        Args:
+            records: Dicts with name, alternate_names, type, country, admin1, population, coordinates.
+        """
+        start = time.perf_counter()
+        self.records = records
+        # Every searchable name (primary, ascii and alternate) -> indexes of the records it names
+        self.name_to_records: Dict[str, List[int]] = {}
+        for index, record in enumerate(records):
+            for name in [record["name"], record.get("ascii_name")] + record.get("alternate_names", []):
+                if name:
+                    self.name_to_records.setdefault(name, [])
+                    if index not in self.name_to_records[name]:
+                        self.name_to_records[name].append(index)
+        self.names = list(self.name_to_records)
+        self.index = LocationIndex(self.names)
+        self.build_seconds = time.perf_counter() - start
+        self.load_seconds = 0.0
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        """
+        Load a GeoNames-style TSV (geonameid, name, asciiname, alternatenames, latitude, longitude,
+        feature class, feature code, country code, cc2, admin1 code, ..., population, ...).
+        Full GeoNames dumps such as cities15000.txt use the same layout.
+        """
+        start = time.perf_counter()
+        records = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                columns = line.rstrip("\n").split("\t")
+                records.append({
+                    "id": columns[0],
+                    "name": columns[1],
+                    "ascii_name": columns[2],
+                    "alternate_names": [name for name in columns[3].split(",") if name],
+                    "coordinates": (float(columns[4]), float(columns[5])),
+                    "type": FEATURE_CLASS_TYPES.get(columns[6], "landmark"),
+                    "country": columns[8],
+                    "admin1": columns[10] if len(columns) > 10 else "",
+                    "population": int(columns[14]) if len(columns) > 14 and columns[14] else 0,
+                })
+        load_seconds = time.perf_counter() - start
+
+        gazetteer = cls(records)
+        gazetteer.load_seconds = load_seconds
+        print(
+            f"Loaded gazetteer with {len(records)} places ({len(gazetteer.names)} names) from {path}: "
+            f"read {gazetteer.load_seconds * 1000:.1f} ms, index built in {gazetteer.build_seconds * 1000:.1f} ms"
+        )
+        return gazetteer
+
+    def match(self, query: str, score_cutoff: int = 80) -> List[Dict]:
+        """
+        Fuzzy-match a query against all known names.
+        Args:
+            query: Location string (e.g., "Pariis", "NYC", "Union Square").
+            score_cutoff: Minimum fuzz.token_set_ratio score (0-100).
+        Returns:
+            The best matching records (several if the best name is shared, e.g. "Springfield"),
+            each with the matched name and score; empty list if nothing reaches the cutoff.
+        """
+        candidates = self.index.search(query, k=None, score_cutoff=score_cutoff)
+        return self._best_records(query, candidates)
+
+    def top_k(self, query: str, k: int = 5, score_cutoff: int = 80) -> List[Tuple[Dict, int]]:
+        """
+        The k best matching records with their fuzz.token_set_ratio scores, best first.
+        """
+        results = []
+        for name, score in self.index.search(query, k=None, score_cutoff=score_cutoff):
+            for index in self.name_to_records[name]:
+                if all(record["id"] != self.records[index]["id"] for record, _ in results):
+                    results.append((self.records[index], score))
+            if len(results) >= k:
+                break
+        return results[:k]
+
+    def _best_records(self, query: str, candidates) -> List[Dict]:
+        if not candidates:
+            return []
+        # token_set_ratio scores any subset match 100 ("Paris" vs "Notre-Dame de Paris"),
+        # so break ties with the plain ratio and then population
+        best_name, best_score = max(
+            candidates,
+            key=lambda candidate: (
+                candidate[1],
+                fuzz.ratio(query.lower(), candidate[0].lower()),
+                max(self.records[i]["population"] for i in self.name_to_records[candidate[0]]),
+            ),
+        )
+        return [
+            {**self.records[index], "matched_name": best_name, "score": best_score}
+            for index in self.name_to_records[best_name]
+        ]
+
+    @staticmethod
+    def display_name(record: Dict, qualified: bool = False) -> str:
+        """
+        Name shown to the user; qualified adds region and country to tell same-named places apart.
+        """
+        if not qualified:
+            return record["name"]
+        parts = [record["name"]]
+        if record.get("admin1") and not record["admin1"].isdigit() and record["admin1"] != "00":
+            parts.append(record["admin1"])
+        if record.get("country"):
+            parts.append(record["country"])
+        return ", ".join(parts)
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer(path: Optional[str] = None) -> Gazetteer:
+    """
+    Process-wide gazetteer, loaded on first use from GAZETTEER_PATH or lib/gazetteer.tsv.
+    """
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load(path or os.getenv("GAZETTEER_PATH", "lib/gazetteer.tsv"))
+    return _gazetteer
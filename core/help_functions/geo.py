@@ -0,0 +1,68 @@
+from typing import Sequence, Tuple
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+
+# Typical speeds (m/s) used to size the places_nearby search radius
+SEARCH_SPEEDS_MPS = {
+    'walking': 1.39,
+    'bicycling': 5.0,
+    'transit': 9.0,
+    'driving': 16.0,
+}
+
+# Fastest plausible average speeds (m/s). Travel distance is never shorter than the straight line,
+# so a place further away than max_speed * max_travel_time cannot be reached in time.
+MAX_SPEEDS_MPS = {
+    'walking': 2.0,     # 7.2 km/h, a brisk walk
+    'bicycling': 8.5,   # ~30 km/h
+    'transit': 35.0,    # ~125 km/h, regional rail
+    'driving': 36.0,    # ~130 km/h, motorway
+}
+
+# Largest radius places_nearby accepts
+MAX_SEARCH_RADIUS_M = 50_000
+
+
+def search_radius(travel_mode: str, max_travel_time: float) -> float:
+    """places_nearby radius (m) for a travel mode and time budget in seconds."""
+    return min(SEARCH_SPEEDS_MPS[travel_mode.lower()] * max_travel_time, MAX_SEARCH_RADIUS_M)
+
+
+def haversine_m(origin: Tuple[float, float], points) -> np.ndarray:
+    """
+    Great-circle distance in metres from origin to every point, vectorized.
+    Args:
+        origin: (lat, lng) in degrees.
+        points: Sequence or (n, 2) array of (lat, lng) in degrees.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    lat1, lng1 = np.radians(origin[0]), np.radians(origin[1])
+    lat2, lng2 = np.radians(points[:, 0]), np.radians(points[:, 1])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def prefilter_reachable(
+    origin: Tuple[float, float],
+    points: Sequence[Tuple[float, float]],
+    travel_mode: str,
+    max_travel_time: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drop points that cannot be reached within max_travel_time even at the mode's maximum speed.
+    Args:
+        origin: (lat, lng) of the user.
+        points: (lat, lng) of the candidates.
+        travel_mode: 'walking', 'driving', 'transit' or 'bicycling'.
+        max_travel_time: Time budget in seconds.
+    Returns:
+        (indices of the remaining points, closest first; their straight-line distances in metres)
+    """
+    if len(points) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    distances = haversine_m(origin, points)
+    reach = MAX_SPEEDS_MPS[travel_mode.lower()] * max_travel_time
+    keep = np.flatnonzero(distances <= reach)
+    order = keep[np.argsort(distances[keep], kind='stable')]
+    return order, distances[order]
@@ -0,0 +1,131 @@
+from fuzzywuzzy import fuzz
+from fuzzywuzzy.utils import full_process
+from collections import Counter
+from typing import Dict, List, Tuple
+import heapq
+import time
+
+
+def trigrams(text: str) -> set:
+    """
+    Character trigrams of each token, padded so word starts and ends get their own grams.
+    Text is normalised the same way fuzzywuzzy scorers do (lowercase, punctuation stripped).
+    """
+    grams = set()
+    for token in full_process(text).split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class LocationIndex:
+    def __init__(self, names: List[str], max_candidates: int = 200, min_overlap: float = 0.3):
+        """
+        Fuzzy name lookup over a character-trigram inverted index.
+
+        Instead of scoring every name, a query only looks at names that share trigrams with it,
+        keeps the max_candidates with the highest trigram overlap and rescores those with
+        fuzz.token_set_ratio, so scores and cutoffs are the same as a linear process.extract scan.
+
+        Args:
+            names: Names to index; search results refer to them by string.
+            max_candidates: How many trigram candidates are rescored per query.
+            min_overlap: Minimum overlap coefficient (shared grams / grams of the shorter side)
+                         for a name to be rescored at all.
+        """
+        start = time.perf_counter()
+        self.names = list(names)
+        self.max_candidates = max_candidates
+        self.min_overlap = min_overlap
+        self.postings: Dict[str, List[int]] = {}
+        self.gram_counts: List[int] = []
+        for name_id, name in enumerate(self.names):
+            grams = trigrams(name)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(name_id)
+        self.build_seconds = time.perf_counter() - start
+
+    def candidates(self, query: str) -> List[int]:
+        """
+        Name ids worth rescoring for query, best trigram overlap first.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        shared = Counter()
+        for gram in query_grams:
+            postings = self.postings.get(gram)
+            if postings:
+                shared.update(postings)
+
+        # Overlap coefficient: token_set_ratio rewards subset matches in either direction,
+        # so normalise by whichever side has fewer grams
+        scored = []
+        for name_id, count in shared.items():
+            overlap = count / min(len(query_grams), self.gram_counts[name_id])
+            if overlap >= self.min_overlap:
+                scored.append((overlap, count, name_id))
+        best = heapq.nlargest(self.max_candidates, scored)
+        return [name_id for _, _, name_id in best]
+
+    def search(self, query: str, k: int = 5, score_cutoff: int = 80) -> List[Tuple[str, int]]:
+        """
+        Top-k fuzzy matches for query.
+        Args:
+            query: Text to look up (e.g., "Pariis").
+            k: Number of matches to return; None returns every candidate above the cutoff.
+            score_cutoff: Minimum fuzz.token_set_ratio score (0-100), as in process.extractOne.
+        Returns:
+            List of (name, score) sorted by score, highest first.
+        """
+        processed_query = full_process(query)
+        if not processed_query:
+            return []
+
+        scored = []
+        for name_id in self.candidates(processed_query):
+            name = self.names[name_id]
+            score = fuzz.token_set_ratio(processed_query, name, force_ascii=True, full_process=True)
+            if score >= score_cutoff:
+                # Plain ratio breaks token_set_ratio ties ("Paris" before "Notre-Dame de Paris")
+                scored.append((score, fuzz.ratio(processed_query, full_process(name)), name))
+
+        scored.sort(reverse=True)
+        results = [(name, score) for score, _, name in scored]
+        return results if k is None else results[:k]
+
+
+if __name__ == '__main__':
+    # Benchmark: trigram index vs the linear process.extractOne scan over a 100k-name gazetteer
+    from fuzzywuzzy import process
+    import random
+
+    random.seed(0)
+    syllables = ['ber', 'lin', 'to', 'ron', 'par', 'is', 'san', 'fran', 'cis', 'co', 'new', 'york', 'ham',
+                 'burg', 'ville', 'ton', 'field', 'spring', 'port', 'land', 'mont', 'real', 'ca', 'sa', 'bel',
+                 'la', 'ro', 'ma', 'ri', 'do', 'ga', 'ste', 'fa', 'no', 'vi', 'zu', 'ko', 'ta', 'mi', 'ne']
+    names = [
+        ' '.join(''.join(random.choices(syllables, k=random.randint(2, 4))).title()
+                 for _ in range(random.randint(1, 2)))
+        for _ in range(100_000)
+    ]
+    names += ['Paris', 'New York City', 'Toronto', 'San Francisco', 'Central Park', 'Eiffel Tower']
+    queries = ['Pariis', 'new york', 'Torronto', 'San Fransisco', 'central park', 'Eifel Tower']
+
+    index = LocationIndex(names)
+    print(f"Indexed {len(names)} names in {index.build_seconds:.2f}s")
+
+    start = time.perf_counter()
+    indexed = [index.search(query, k=1) for query in queries]
+    indexed_time = (time.perf_counter() - start) / len(queries)
+
+    start = time.perf_counter()
+    linear = [process.extractOne(query, names, scorer=fuzz.token_set_ratio, score_cutoff=80) for query in queries]
+    linear_time = (time.perf_counter() - start) / len(queries)
+
+    for query, fast, slow in zip(queries, indexed, linear):
+        print(f"{query!r:18} index: {fast[0] if fast else None}  linear: {slow}")
+    print(f"linear scan: {linear_time * 1000:.1f} ms/query")
+    print(f"trigram:     {indexed_time * 1000:.2f} ms/query ({linear_time / indexed_time:.0f}x faster)")
@@ -0,0 +1,136 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+import threading
+import json
+import time
+
+
+def echo_responder(messages: List[Dict]) -> Dict:
+    """Default reply: a JSON object echoing the last user message."""
+    return {"echo": messages[-1]["content"]}
+
+
+class MockLLMServer:
+    def __init__(
+        self,
+        responder: Optional[Callable[[List[Dict]], Dict]] = None,
+        latency: float = 0.0,
+        fail_first: int = 0,
+        fail_status: int = 500,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Minimal OpenAI-compatible /v1/chat/completions endpoint for exercising LLMClient locally
+        (retries, rate limiting, connection reuse, stats) without calling the real API.
+
+        Usage:
+            with MockLLMServer(responder=lambda messages: {"google_place_type": "cafe"}) as server:
+                client = LLMClient(api_key="test", base_url=server.base_url)
+        Args:
+            responder: Builds the JSON reply from the request messages.
+            latency: Seconds each response is delayed.
+            fail_first: Number of initial requests answered with fail_status.
+            fail_status: HTTP status of the injected failures (e.g. 429 or 500).
+            host, port: Address to listen on; port 0 picks a free port.
+        """
+        self.responder = responder or echo_responder
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = []
+        self.connections = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Dict):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests.append(body)
+                    server.connections.add(self.client_address)
+                    fail = len(server.requests) <= server.fail_first
+                if server.latency:
+                    time.sleep(server.latency)
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                if fail:
+                    self._send(server.fail_status, {"error": {"message": "Injected failure", "type": "server_error"}})
+                    return
+
+                messages = body.get("messages", [])
+                content = json.dumps(server.responder(messages))
+                prompt_tokens = sum(len(message.get("content", "")) // 4 for message in messages)
+                completion_tokens = len(content) // 4
+                self._send(200, {
+                    "id": f"chatcmpl-mock-{len(server.requests)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                        "prompt_tokens_details": {"cached_tokens": 0}
+                    }
+                })
+
+        return Handler
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    # Demo: 20 calls against the mock server, the first two failing with 429
+    from core.help_functions.LLMClient import LLMClient, RateLimiter
+
+    with MockLLMServer(latency=0.02, fail_first=2, fail_status=429) as server:
+        client = LLMClient(api_key="test", base_url=server.base_url, rate_limiter=RateLimiter(requests_per_minute=6000))
+        for i in range(20):
+            client.call_llm("You are a good assistant", f"query {i}")
+        print(client.stats())
+        print(f"{len(server.requests)} requests over {len(server.connections)} connection(s)")
@@ -0,0 +1,118 @@
+from core.vector_search.vector_embedding import embedding_service
+from fuzzywuzzy import process, fuzz
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import time
+import re
+
+
+def normalize_place(place: str) -> str:
+    """Lowercase, trim and turn separators into spaces ("Book-Store" -> "book store")."""
+    return re.sub(r"[\s_\-]+", " ", place.strip().lower())
+
+
+class PlaceTypeMapper:
+    def __init__(self, allowed_places: List[str], synonyms: Optional[Dict[str, str]] = None, score_cutoff: int = 85):
+        """
+        Offline mapping from free-text place descriptions to Google Maps place types.
+        Args:
+            allowed_places: Google place types (from lib/allowed_places.yaml).
+            synonyms: Everyday wording -> allowed type (e.g., {"coffee shop": "cafe"}).
+            score_cutoff: Minimum fuzz.token_sort_ratio for a fuzzy match against type names.
+        """
+        self.allowed_places = list(allowed_places)
+        self.allowed_set = set(self.allowed_places)
+        self.score_cutoff = score_cutoff
+        # Readable form of every type and synonym -> type
+        self.lookup = {normalize_place(place): place for place in self.allowed_places}
+        for phrase, place in (synonyms or {}).items():
+            if place in self.allowed_set:
+                self.lookup.setdefault(normalize_place(phrase), place)
+
+    def is_allowed(self, place: Optional[str]) -> bool:
+        return place in self.allowed_set
+
+    def map(self, place_to_search: Optional[str]) -> Optional[str]:
+        """
+        Map a place description to an allowed type.
+        Args:
+            place_to_search: e.g. "coffee shop", "Bookstores", "book_store".
+        Returns:
+            The Google place type, or None if there is no confident match.
+        """
+        if not place_to_search:
+            return None
+        place = normalize_place(place_to_search)
+
+        exact = self._exact(place)
+        if exact:
+            return exact
+
+        best_match = process.extractOne(
+            place,
+            list(self.lookup),
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=self.score_cutoff
+        )
+        if best_match:
+            return self.lookup[best_match[0]]
+        return None
+
+    def _exact(self, place: str) -> Optional[str]:
+        # Exact type or synonym, also without a plural "s"
+        for candidate in (place, place[:-1] if place.endswith("s") else None):
+            if candidate and candidate in self.lookup:
+                return self.lookup[candidate]
+        return None
+
+
+class EmbeddingPlaceTypeMapper(PlaceTypeMapper):
+    def __init__(self, allowed_places: List[str], synonyms: Optional[Dict[str, str]] = None, threshold: float = 0.6):
+        """
+        Nearest-neighbour place-type mapping over sentence embeddings.
+
+        Every allowed type and synonym is embedded once at construction; a query is mapped to the
+        type of its most similar entry by cosine similarity.
+        Args:
+            allowed_places: Google place types (from lib/allowed_places.yaml).
+            synonyms: Everyday wording -> allowed type (e.g., {"coffee shop": "cafe"}).
+            threshold: Minimum cosine similarity for a mapping to count as confident.
+        """
+        super().__init__(allowed_places, synonyms=synonyms)
+        self.embedding_service = embedding_service
+        self.threshold = threshold
+        self.phrases = list(self.lookup)
+        self.labels = [self.lookup[phrase] for phrase in self.phrases]
+
+        start = time.perf_counter()
+        self.phrase_matrix = self._embed(self.phrases)
+        self.build_seconds = time.perf_counter() - start
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.embedding_service.encode(texts, as_numpy=True).astype(np.float32, copy=False)
+        return embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+    def map_with_score(self, place_to_search: Optional[str]) -> Tuple[Optional[str], float]:
+        """
+        Most similar place type and its cosine similarity (1.0 for exact types and synonyms).
+        """
+        if not place_to_search:
+            return None, 0.0
+        place = normalize_place(place_to_search)
+
+        exact = self._exact(place)
+        if exact:
+            return exact, 1.0
+
+        similarities = self.phrase_matrix @ self._embed([place])[0]
+        best = int(np.argmax(similarities))
+        return self.labels[best], float(similarities[best])
+
+    def map(self, place_to_search: Optional[str]) -> Optional[str]:
+        """
+        Map a place description to an allowed type.
+        Returns:
+            The Google place type, or None if the best match is below the confidence threshold.
+        """
+        place, score = self.map_with_score(place_to_search)
+        return place if score >= self.threshold else None
@@ -0,0 +1,197 @@
+from core.vector_search.vector_embedding import embedding_service
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+import threading
+import copy
+import time
+import re
+
+
+NUMBER_WORDS = {
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+    "fifteen", "twenty", "thirty", "forty", "forty-five", "fifty", "sixty", "half", "quarter",
+}
+
+# Capitalised words that start or fill a request rather than name a place
+NON_NAMES = {
+    "i", "i'm", "im", "i'd", "what", "what's", "where", "which", "who", "how", "can", "could", "would",
+    "will", "find", "any", "are", "is", "do", "does", "looking", "suggest", "recommend", "show", "give",
+    "tell", "need", "want", "please", "hi", "hey", "hello", "the", "a", "an", "me", "my", "we", "our",
+    "there", "let's", "know", "help", "search", "get", "best", "good", "top", "nice", "google", "maps",
+}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, unify quotes, drop punctuation and collapse whitespace."""
+    query = query.lower().replace("’", "'").replace("‘", "'")
+    query = re.sub(r"[^\w\s']", " ", query)
+    return " ".join(query.split())
+
+
+def query_signature(query: str) -> frozenset:
+    """
+    Tokens two queries must share for one to reuse the other's extraction: numbers (minutes,
+    stars; digits and number words) and capitalised names (cities, landmarks). The first word of
+    a sentence is capitalised anyway, so it only counts as a number.
+    """
+    query = query.replace("’", "'").replace("‘", "'")
+    signature = set()
+    for sentence in re.split(r"[.!?]\s+", query):
+        tokens = re.findall(r"\d+(?:[.,]\d+)?|[\w'-]+", sentence)
+        for position, token in enumerate(tokens):
+            lowered = token.lower()
+            if token[0].isdigit() or lowered in NUMBER_WORDS:
+                signature.add(lowered.replace(",", "."))
+            elif position > 0 and token[0].isupper() and lowered not in NON_NAMES:
+                signature.add(lowered)
+    return frozenset(signature)
+
+
+class QueryCache:
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1000,
+        similarity_threshold: float = 0.95,
+        semantic: bool = False,
+    ):
+        """
+        Two-tier cache of LLM extraction results.
+
+        The exact tier is keyed on the normalised query text. The semantic tier embeds the query and
+        reuses the result of the most similar cached query if their cosine similarity reaches
+        similarity_threshold. Queries differing only in a city, minutes or stars embed almost
+        identically, so a semantic hit also needs the same query_signature (numbers and names),
+        and the cached extraction's location must appear in the new query. Entries expire after
+        ttl_seconds; beyond max_entries the least recently used entry is evicted, which also bounds
+        the memory of the embedding matrix.
+        Args:
+            ttl_seconds: Lifetime of a cached extraction.
+            max_entries: Maximum number of cached queries.
+            similarity_threshold: Minimum cosine similarity for a semantic hit.
+            semantic: Enable the semantic tier (off by default; only the exact tier is used).
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.semantic = semantic
+        # normalised query -> (value, expires_at, slot in the embedding matrix, query_signature)
+        self._entries = OrderedDict()
+        self._vectors = None
+        self._slot_keys = [None] * max_entries
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["QueryCache"]:
+        """Build from the settings.query_cache block of lib/config.yaml; None if disabled."""
+        config = config or {}
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            ttl_seconds=config.get("ttl_seconds", 3600),
+            max_entries=config.get("max_entries", 1000),
+            similarity_threshold=config.get("similarity_threshold", 0.95),
+            semantic=config.get("semantic", False),
+        )
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = embedding_service.encode([text], as_numpy=True)[0].astype(np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, query: str) -> Optional[Dict]:
+        """
+        Cached extraction for query (a copy the caller may modify), or None.
+        """
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return copy.deepcopy(entry[0])
+            if entry is not None:
+                self._remove(key)
+
+        if self.semantic:
+            vector = self._embed(key)
+            signature = query_signature(query)
+            with self._lock:
+                if self._vectors is not None and self._entries:
+                    similarities = self._vectors @ vector
+                    for slot in np.argsort(-similarities):
+                        if similarities[slot] < self.similarity_threshold:
+                            break
+                        match = self._slot_keys[slot]
+                        if match is None:
+                            continue
+                        entry = self._entries[match]
+                        if entry[1] <= now or not self._compatible(entry, key, signature):
+                            continue
+                        self._entries.move_to_end(match)
+                        self.semantic_hits += 1
+                        return copy.deepcopy(entry[0])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, query: str, value: Dict):
+        """Cache the extraction for query, evicting the least recently used entry if full."""
+        key = normalize_query(query)
+        vector = self._embed(key) if self.semantic else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            slot = None
+            if vector is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                slot = self._slot_keys.index(None)
+                self._vectors[slot] = vector
+                self._slot_keys[slot] = key
+            self._entries[key] = (copy.deepcopy(value), time.time() + self.ttl_seconds, slot, query_signature(query))
+
+    @staticmethod
+    def _compatible(entry, key: str, signature: frozenset) -> bool:
+        """Whether a similar cached query may answer this one: same numbers and names, same location."""
+        value, _, _, cached_signature = entry
+        if cached_signature != signature:
+            return False
+        # Catches locations typed in lower case, which the signature cannot see
+        location = value.get("location") if isinstance(value, dict) else None
+        if isinstance(location, str) and location.strip():
+            words = set(key.split())
+            return all(word in words for word in normalize_query(location).split())
+        return True
+
+    def _remove(self, key: str):
+        _, _, slot, _ = self._entries.pop(key)
+        if slot is not None:
+            self._vectors[slot] = 0.0
+            self._slot_keys[slot] = None
+
+    def stats(self) -> Dict:
+        """Exact and semantic hit counts, misses, hit rate and number of cached queries."""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors = None
+            self._slot_keys = [None] * self.max_entries
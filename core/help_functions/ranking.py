@@ -1,110 +1,327 @@
-from core.vector_search.vector_embedding import vector_embedding
-import torch
-import torch
-from sentence_transformers import util
+from core.vector_search.vector_embedding import embedding_service
+import numpy as np
+import heapq
 
-def rank_places(data, keywords=None, weights=None):
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def _similarity_per_place(keywords, review_texts, segment_ids, num_places):
     """
-    Rank places based on review similarity (if keywords provided), rating, and total travel time.
-    
+    Score every review against every keyword in one batch and reduce to one mean per place.
+
     Args:
-        data (list): List of dictionaries with 'place' (str), 'reviews' (list of dicts with 'text', etc.),
-                     'rating' (float/int, 1-5), and 'total_travel_time' (float/int, minutes).
-        keywords (str or list, optional): Keywords for similarity search (e.g., "cozy friendly comfortable").
-                                         If None, empty string, or empty list, similarity is ignored.
-        weights (dict, optional): Weights for scoring components. Defaults depend on keywords:
-                                 With keywords: {'similarity': 0.5, 'rating': 0.3, 'travel_time': 0.2}.
-                                 Without keywords: {'rating': 0.6, 'travel_time': 0.4}.
-    
+        keywords (list): Keyword strings.
+        review_texts (list): Review texts of all places, concatenated.
+        segment_ids (np.ndarray): For each review, the index of the place it belongs to.
+        num_places (int): Number of places (segments).
+
     Returns:
-        list: List of dictionaries with original place data, plus 'combined_score' and
-              'average_similarity' (if keywords provided), sorted by combined_score.
+        np.ndarray: Mean cosine similarity per place, shape (num_places,).
     """
+    # Keywords and reviews go through the model in a single encode call
+    embeddings = embedding_service.encode(list(keywords) + list(review_texts), as_numpy=True)
+    embeddings = _normalize_rows(embeddings.astype(np.float32, copy=False))
+    keyword_matrix = embeddings[:len(keywords)]
+    review_matrix = embeddings[len(keywords):]
+
+    # (reviews x keywords) cosine similarities, averaged over keywords for each review
+    review_scores = (review_matrix @ keyword_matrix.T).mean(axis=1)
+
+    # Segment mean: sum of review scores per place / number of reviews per place
+    sums = np.bincount(segment_ids, weights=review_scores, minlength=num_places)
+    counts = np.bincount(segment_ids, minlength=num_places)
+    return sums / counts
+
+
+def _resolve_weights(keywords, weights):
+    """Shared argument handling of rank_places: (use_keywords, keywords as a list, weights)."""
     # Determine if keywords are provided
     use_keywords = keywords and (isinstance(keywords, str) and keywords.strip()) or (isinstance(keywords, list) and keywords)
-    
+
     # Set default weights based on whether keywords are used
     if weights is None:
         if use_keywords:
             weights = {'similarity': 0.5, 'rating': 0.3, 'travel_time': 0.2}
         else:
             weights = {'rating': 0.6, 'travel_time': 0.4}
-    
+
     # Validate weights
     total_weight = sum(weights.values())
     if not (0.99 <= total_weight <= 1.01):  # Allow small float errors
         raise ValueError("Weights must sum to 1")
-    
-    # Prepare keywords if provided
-    if use_keywords:
-        if isinstance(keywords, str):
-            keywords = [keywords]
-        # Compute embeddings for keywords
-        keyword_embeddings, _ = vector_embedding(keywords)
-        if torch.cuda.is_available():
-            keyword_embeddings = keyword_embeddings.to('cuda')
-    
-    # Process reviews and calculate scores
-    place_scores = []
-    
+
+    if use_keywords and isinstance(keywords, str):
+        keywords = [keywords]
+    return bool(use_keywords), keywords, weights
+
+
+def _score_places(data, use_keywords, keywords, weights):
+    """
+    Combined scores of all valid places in data.
+
+    Returns:
+        tuple: (valid place dicts, combined scores, average similarities or None)
+    """
+    # Collect valid places and flatten their reviews into one batch
+    places = []
+    ratings = []
+    travel_times = []
+    review_texts = []
+    segment_ids = []
+
     for place_data in data:
         place_name = place_data.get("name")
-        reviews = place_data.get("reviews", [])
         rating = place_data.get("rating", 0)
         travel_time = place_data.get("travel_time", float('inf'))
-        
+
         if not place_name or rating <= 0 or travel_time <= 0:
             continue  # Skip invalid or incomplete data
-        
-        # Initialize scores
-        avg_similarity = 0
+
         if use_keywords:
-            # Extract review texts
-            review_texts = [review.get("text", "") for review in reviews if review.get("text")]
-            if not review_texts:
+            texts = [review.get("text", "") for review in place_data.get("reviews", []) if review.get("text")]
+            if not texts:
                 continue  # Skip if no valid review texts
-            
-            # Compute similarity score
-            review_embeddings, _ = vector_embedding(review_texts)
+            review_texts.extend(texts)
+            segment_ids.extend([len(places)] * len(texts))
+
+        places.append(place_data)
+        ratings.append(rating)
+        travel_times.append(travel_time)
+
+    if not places:
+        return [], np.empty(0), None
+
+    # Normalize rating (1-5 to 0-1) and travel time (shorter is better, 0-1)
+    rating_scores = np.asarray(ratings, dtype=np.float64) / 5.0
+    travel_time_scores = 1 / (1 + np.asarray(travel_times, dtype=np.float64))
+
+    # Compute combined scores for all places at once
+    if use_keywords:
+        avg_similarities = _similarity_per_place(
+            keywords, review_texts, np.asarray(segment_ids, dtype=np.int64), len(places)
+        )
+        combined_scores = (
+            weights['similarity'] * avg_similarities +
+            weights['rating'] * rating_scores +
+            weights['travel_time'] * travel_time_scores
+        )
+    else:
+        avg_similarities = None
+        combined_scores = (
+            weights['rating'] * rating_scores +
+            weights['travel_time'] * travel_time_scores
+        )
+    return places, combined_scores, avg_similarities
+
+
+def _scored_copy(place_data, combined_score, similarity):
+    # Copy place_data and add scores
+    place_dict = place_data.copy()
+    place_dict["combined_score"] = float(combined_score)
+    if similarity is not None:
+        place_dict["average_similarity"] = float(similarity)
+    return place_dict
+
+
+def rank_places(data, keywords=None, weights=None, k=None):
+    """
+    Rank places based on review similarity (if keywords provided), rating, and total travel time.
+
+    Args:
+        data (list): List of dictionaries with 'place' (str), 'reviews' (list of dicts with 'text', etc.),
+                     'rating' (float/int, 1-5), and 'total_travel_time' (float/int, minutes).
+        keywords (str or list, optional): Keywords for similarity search (e.g., "cozy friendly comfortable").
+                                         If None, empty string, or empty list, similarity is ignored.
+        weights (dict, optional): Weights for scoring components. Defaults depend on keywords:
+                                 With keywords: {'similarity': 0.5, 'rating': 0.3, 'travel_time': 0.2}.
+                                 Without keywords: {'rating': 0.6, 'travel_time': 0.4}.
+        k (int, optional): Only return the k best places, selected with a bounded heap (TopKRanker)
+                           instead of sorting and copying every place.
+
+    Returns:
+        list: List of dictionaries with original place data, plus 'combined_score' and
+              'average_similarity' (if keywords provided), sorted by combined_score.
+    """
+    if k is not None:
+        ranker = TopKRanker(k, keywords=keywords, weights=weights)
+        ranker.push_many(data)
+        return ranker.top()
+
+    use_keywords, keywords, weights = _resolve_weights(keywords, weights)
+    places, combined_scores, avg_similarities = _score_places(data, use_keywords, keywords, weights)
+    if not places:
+        return []
+
+    # Sort by combined_score in descending order (stable, ties keep input order)
+    order = np.argsort(-combined_scores, kind='stable')
+
+    return [
+        _scored_copy(places[index], combined_scores[index], avg_similarities[index] if use_keywords else None)
+        for index in order
+    ]
+
+
+class TopKRanker:
+    def __init__(self, k=5, keywords=None, weights=None):
+        """
+        Running top-k leaderboard over places pushed one by one or in batches, e.g. across streamed
+        or paginated results of several queries.
+
+        A min-heap of size k holds (score, arrival) entries; a place that does not beat the current
+        k-th best is dropped without being copied. Scores are the same as rank_places and ties keep
+        arrival order.
+
+        Args:
+            k (int): Number of places to keep.
+            keywords, weights: As in rank_places.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.use_keywords, self.keywords, self.weights = _resolve_weights(keywords, weights)
+        self._heap = []
+        self._arrivals = 0
+        self.pushed = 0
+
+    def push(self, place_data):
+        """
+        Score one place and keep it if it is among the k best so far.
+
+        Returns:
+            float: The place's combined_score, or None if the place could not be ranked.
+        """
+        scores = self.push_many([place_data])
+        return scores[0] if scores else None
+
+    def push_many(self, data):
+        """
+        Score a batch of places with one embedding call and keep those among the k best.
+
+        Returns:
+            list: combined_score of every place that could be ranked, in input order.
+        """
+        places, combined_scores, avg_similarities = _score_places(data, self.use_keywords, self.keywords, self.weights)
+        for index, place_data in enumerate(places):
+            self.pushed += 1
+            # Earlier arrivals win ties, so the later one is the smaller heap entry
+            entry = (
+                float(combined_scores[index]),
+                -self._arrivals,
+                place_data,
+                float(avg_similarities[index]) if self.use_keywords else None
+            )
+            self._arrivals += 1
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+            elif entry[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entry)
+        return [float(score) for score in combined_scores]
+
+    def top(self, k=None):
+        """
+        The current best places (at most k, default all kept), best first, as scored copies.
+        """
+        entries = heapq.nlargest(self.k if k is None else k, self._heap, key=lambda entry: entry[:2])
+        return [_scored_copy(place_data, score, similarity) for score, _, place_data, similarity in entries]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+def rank_places_incrementally(places, keywords=None, weights=None, k=5):
+    """
+    Consume places one at a time (e.g., from iter_places_within_travel_distance) and yield a
+    provisional top-k after every place that could be ranked, so the first results can be shown
+    before the search has finished.
+
+    Args:
+        places (iterable): Place dicts as accepted by rank_places.
+        keywords, weights: As in rank_places.
+        k (int): Number of places in each provisional ranking.
+
+    Yields:
+        list: The current top-k places, best first, with scores as returned by rank_places.
+    """
+    ranker = TopKRanker(k, keywords=keywords, weights=weights)
+    for place_data in places:
+        if ranker.push(place_data) is not None:
+            yield ranker.top()
+
+
+if __name__ == '__main__':
+    # Benchmark: 60 candidates x 5 reviews, batched engine vs the previous per-place loop
+    from core.vector_search.vector_embedding import vector_embedding
+    from core.vector_search.embedding_cache import EmbeddingCache
+    from sentence_transformers import util
+    import random
+    import time
+
+    random.seed(0)
+    words = ['cozy', 'quiet', 'friendly', 'staff', 'coffee', 'noisy', 'great', 'view', 'cheap', 'slow',
+             'service', 'pastry', 'clean', 'music', 'crowded', 'tasty', 'outdoor', 'seating', 'wifi', 'bread']
+    data = [
+        {
+            'name': f'Place {i}',
+            'rating': round(random.uniform(3.0, 5.0), 1),
+            'travel_time': round(random.uniform(1, 15), 1),
+            'reviews': [{'text': ' '.join(random.choices(words, k=30))} for _ in range(5)],
+        }
+        for i in range(60)
+    ]
+    keywords = ['cozy', 'quiet', 'good coffee']
+
+    def rank_places_loop(data, keywords):
+        keyword_embeddings, _ = vector_embedding(keywords)
+        scores = []
+        for place_data in data:
+            review_embeddings, _ = vector_embedding([review['text'] for review in place_data['reviews']])
             similarities = []
             for review_emb in review_embeddings:
-                if torch.cuda.is_available():
-                    review_emb = review_emb.to('cuda')
-                # Average similarity across keywords
                 review_similarities = [util.cos_sim(review_emb, kw_emb).item() for kw_emb in keyword_embeddings]
                 similarities.append(sum(review_similarities) / len(review_similarities))
-            
-            avg_similarity = sum(similarities) / len(similarities) if similarities else 0
-        
-        # Normalize rating (1-5 to 0-1)
-        rating_score = rating / 5.0
-        
-        # Normalize travel time (shorter is better, 0-1)
-        travel_time_score = 1 / (1 + travel_time)
-        
-        # Compute combined score
-        if use_keywords:
-            combined_score = (
-                weights['similarity'] * avg_similarity +
-                weights['rating'] * rating_score +
-                weights['travel_time'] * travel_time_score
-            )
-        else:
-            combined_score = (
-                weights['rating'] * rating_score +
-                weights['travel_time'] * travel_time_score
-            )
-        
-        # Copy place_data and add scores
-        place_dict = place_data.copy()
-        place_dict["combined_score"] = combined_score
-        if use_keywords:
-            place_dict["average_similarity"] = avg_similarity
-        
-        place_scores.append(place_dict)
-    
-    # Sort by combined_score in descending order
-    place_scores.sort(key=lambda x: x["combined_score"], reverse=True)
-    
-    return place_scores
-    
+            scores.append(sum(similarities) / len(similarities))
+        return scores
+
+    embedding_service.warm_up()
+    # Both paths encode every text: with the persistent cache, whichever ran second would only measure cache hits
+    cache, embedding_service.cache = embedding_service.cache, None
+
+    start = time.perf_counter()
+    loop_scores = rank_places_loop(data, keywords)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranked = rank_places(data, keywords=keywords)
+    batched_time = time.perf_counter() - start
+
+    batched_scores = {place['name']: place['average_similarity'] for place in ranked}
+    max_diff = max(abs(batched_scores[place['name']] - score) for place, score in zip(data, loop_scores))
+    print(f"per-place loop: {loop_time * 1000:.1f} ms")
+    print(f"batched:        {batched_time * 1000:.1f} ms ({loop_time / batched_time:.1f}x faster)")
+    print(f"max |similarity difference|: {max_diff:.2e}")
+
+    # Embedding cache on its own: the same ranking with an empty cache, then with every text in it
+    embedding_service.cache = EmbeddingCache(':memory:')
+    start = time.perf_counter()
+    rank_places(data, keywords=keywords)
+    cold_time = time.perf_counter() - start
+    start = time.perf_counter()
+    rank_places(data, keywords=keywords)
+    warm_time = time.perf_counter() - start
+    embedding_service.cache = cache
+    print(f"embedding cache: empty {cold_time * 1000:.1f} ms, all hits {warm_time * 1000:.1f} ms "
+          f"({cold_time / warm_time:.1f}x faster)")
+
+    # Top-k mode on a wide candidate pool (no keywords, so only the selection differs)
+    pool = [dict(place, name=f'Place {i}') for i, place in enumerate(data * 50)]
+    start = time.perf_counter()
+    full_top = rank_places(pool)[:10]
+    full_time = time.perf_counter() - start
+    start = time.perf_counter()
+    heap_top = rank_places(pool, k=10)
+    heap_time = time.perf_counter() - start
+    print(f"full sort of {len(pool)}: {full_time * 1000:.1f} ms, top-10 heap: {heap_time * 1000:.1f} ms, "
+          f"same result: {[p['name'] for p in full_top] == [p['name'] for p in heap_top]}")
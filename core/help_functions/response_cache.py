@@ -0,0 +1,207 @@
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Seconds each endpoint's responses stay valid
+DEFAULT_TTLS = {
+    'place': 24 * 3600,          # place details rarely change within a day
+    'distance_matrix': 30 * 60,  # travel times drift with traffic
+    'places_nearby': 15 * 60,    # open_now results change through the day
+    'geocode': 30 * 24 * 3600,   # place names resolve to the same coordinates for weeks
+}
+
+
+def quantize_location(location, precision=3):
+    """
+    Snap a (lat, lng) pair to a grid so nearby coordinates share cache entries.
+    precision=3 is roughly a 110 m grid; strings (addresses) are returned normalised.
+    """
+    if isinstance(location, str):
+        return location.strip().lower()
+    lat, lng = location
+    return (round(float(lat), precision), round(float(lng), precision))
+
+
+class MemoryStore:
+    def __init__(self, max_entries=10_000):
+        """
+        Bounded in-process store; evicts the least recently used entry when full.
+        """
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteStore:
+    def __init__(self, path):
+        """
+        Persistent store so cached responses survive restarts and are shared between processes.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        # Opened lazily so importing a module with a cache never touches the disk
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            row = self._connect().execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._connect().execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, value, expires_at))
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._connect().execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+
+class ResponseCache:
+    def __init__(self, ttls=None, max_entries=10_000, path=None, location_precision=3):
+        """
+        Two-tier cache for API responses: an in-memory LRU in front of an optional SQLite store.
+
+        Values are stored as JSON, so every hit returns a fresh copy the caller can mutate.
+
+        Args:
+            ttls (dict, optional): Seconds to keep responses per endpoint; merged over DEFAULT_TTLS.
+            max_entries (int): Size of the in-memory tier.
+            path (str, optional): SQLite file for the persistent tier; memory only if None.
+            location_precision (int): Decimal places kept when quantizing coordinates in keys.
+        """
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.location_precision = location_precision
+        self.memory = MemoryStore(max_entries=max_entries)
+        self.disk = SQLiteStore(path) if path else None
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def quantize(self, location):
+        return quantize_location(location, precision=self.location_precision)
+
+    @staticmethod
+    def make_key(endpoint, **params):
+        return endpoint + ':' + json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, endpoint, key):
+        """
+        Return the cached value for key, or None on a miss (expired entries count as misses).
+        """
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None and entry[1] > now:
+                # Promote to the memory tier
+                self.memory.set(key, *entry)
+
+        if entry is None or entry[1] <= now:
+            self._count(endpoint, 'misses')
+            return None
+
+        self._count(endpoint, 'hits')
+        return json.loads(entry[0])
+
+    def set(self, endpoint, key, value, ttl=None):
+        ttl = self.ttls.get(endpoint, 0) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        serialized = json.dumps(value)
+        expires_at = time.time() + ttl
+        self.memory.set(key, serialized, expires_at)
+        if self.disk is not None:
+            self.disk.set(key, serialized, expires_at)
+
+    def get_or_call(self, endpoint, key, fn):
+        """
+        Return the cached value for key, or call fn(), cache its result and return it.
+        Exceptions from fn propagate and are never cached.
+        """
+        value = self.get(endpoint, key)
+        if value is not None:
+            self.record_saved_calls(endpoint)
+            return value
+        value = fn()
+        self.set(endpoint, key, value)
+        return value
+
+    def record_saved_calls(self, endpoint, count=1):
+        self._count(endpoint, 'saved_calls', count)
+
+    def stats(self):
+        """
+        Per-endpoint hits, misses, hit_rate and saved_calls (API requests avoided).
+        """
+        with self._stats_lock:
+            result = {}
+            for endpoint, counts in self._stats.items():
+                lookups = counts.get('hits', 0) + counts.get('misses', 0)
+                result[endpoint] = {
+                    'hits': counts.get('hits', 0),
+                    'misses': counts.get('misses', 0),
+                    'hit_rate': counts.get('hits', 0) / lookups if lookups else 0.0,
+                    'saved_calls': counts.get('saved_calls', 0),
+                }
+            return result
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        with self._stats_lock:
+            self._stats = {}
+
+    def _count(self, endpoint, name, count=1):
+        with self._stats_lock:
+            counts = self._stats.setdefault(endpoint, {})
+            counts[name] = counts.get(name, 0) + count
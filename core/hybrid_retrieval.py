@@ -0,0 +1,148 @@
+from core.google_maps_api import find_places_within_travel_distance, get_travel_time
+from core.help_functions.geo import search_radius, prefilter_reachable
+
+from typing import Dict, List, Optional, Tuple
+import time
+
+# Places older than this are refreshed from Google Maps before they are served again
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class HybridRetriever:
+    def __init__(
+        self,
+        vector_db,
+        collection_name: str = 'test_collection',
+        min_results: int = 5,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        limit: int = 20,
+        store_results: bool = True,
+        search=find_places_within_travel_distance,
+        travel_times=get_travel_time,
+    ):
+        """
+        Serve place searches from the vector store and call Google Maps only on a miss.
+
+        The store is queried with the location (geo radius for the travel budget), place type,
+        star threshold and the additional requests as query text. The stored places are then
+        timed from the user's location with one distance-matrix call (elements are cached), and
+        those over the travel budget are dropped. When fewer than min_results fresh places within
+        the budget remain, the live search runs and its places are written to the store
+        (refreshing their indexed_at), so the next query in the area is a hit.
+
+        Args:
+            vector_db: Vector_DB to read from and write to.
+            collection_name: Collection holding the places.
+            min_results: Fresh stored places needed to skip the live search.
+            ttl_seconds: Age (seconds since indexed_at) after which a stored place is not served.
+            limit: Maximum number of places returned from the store.
+            store_results: Write the places of live searches to the store.
+            search: Live search, find_places_within_travel_distance or a compatible function.
+            travel_times: Travel times (seconds) from an origin to stored places, get_travel_time
+                          or a compatible function.
+        """
+        self.vector_db = vector_db
+        self.collection_name = collection_name
+        self.min_results = min_results
+        self.ttl_seconds = ttl_seconds
+        self.limit = limit
+        self.store_results = store_results
+        self.search = search
+        self.travel_times = travel_times
+        self.hits = 0
+        self.misses = 0
+
+    def retrieve(
+        self,
+        location: Tuple[float, float],
+        place_type: str,
+        travel_mode: str = 'walking',
+        max_travel_time: float = 900,
+        minimum_star_requirement: float = 0,
+        additional_requests: Optional[List[str]] = None,
+        **search_kwargs,
+    ) -> Tuple[List[Dict], str]:
+        """
+        Places matching the query, from the store when it has enough fresh ones.
+        Args:
+            location: (lat, lng) of the user.
+            place_type: Google place type, e.g. 'cafe'.
+            travel_mode: 'walking', 'driving', 'transit' or 'bicycling'.
+            max_travel_time: Travel budget in seconds.
+            minimum_star_requirement: Minimum rating.
+            additional_requests: Free-text requests (e.g. ['quiet', 'outdoor seating']) matched
+                                 against the stored review embeddings.
+            **search_kwargs: Passed on to the live search.
+        Returns:
+            (places in the shape find_places_within_travel_distance returns, 'store' or 'maps')
+        """
+        stored = self._from_store(location, place_type, travel_mode, max_travel_time,
+                                  minimum_star_requirement, additional_requests, search_kwargs.get('client'))
+        if len(stored) >= self.min_results:
+            self.hits += 1
+            return stored, 'store'
+
+        self.misses += 1
+        places = self.search(
+            location=location,
+            minimum_star_requirement=minimum_star_requirement,
+            place_type=place_type,
+            travel_mode=travel_mode,
+            max_travel_time=max_travel_time,
+            **search_kwargs,
+        )
+        if self.store_results and places:
+            try:
+                self.vector_db.add_places(collection_name=self.collection_name, places=places, place_type=place_type)
+            except Exception as e:
+                print(f"Could not store places in '{self.collection_name}': {e}")
+        return places, 'maps'
+
+    def _from_store(self, location, place_type, travel_mode, max_travel_time, minimum_star_requirement,
+                    additional_requests, client=None):
+        """
+        Fresh stored places within the travel budget, with travel_time and travel_mode set like the
+        live search sets them; [] if the store or the travel times are unavailable.
+        """
+        query_text = ', '.join(additional_requests) if additional_requests else None
+        try:
+            results = self.vector_db.find_nearby_points(
+                self.collection_name,
+                location[0],
+                location[1],
+                radius_km=search_radius(travel_mode, max_travel_time) / 1000,
+                query_text=query_text,
+                limit=self.limit,
+                min_rating=minimum_star_requirement or None,
+                place_type=place_type,
+                indexed_after=time.time() - self.ttl_seconds,
+            )
+        except Exception as e:
+            # Missing collection or unreachable server: fall back to the live search
+            print(f"Vector store lookup failed, searching Google Maps instead: {e}")
+            return []
+
+        places = [payload for payload, _ in results if payload.get('location')]
+        # The geo radius is only an upper bound: check the straight line first, then the real route
+        order, _ = prefilter_reachable(location, [tuple(place['location']) for place in places], travel_mode, max_travel_time)
+        places = [places[index] for index in sorted(order)]
+        if not places:
+            return []
+        try:
+            times = self.travel_times(location, [tuple(place['location']) for place in places],
+                                      travel_mode=travel_mode, client=client)
+        except Exception as e:
+            print(f"Travel times for stored places failed, searching Google Maps instead: {e}")
+            return []
+
+        reachable = []
+        for place, travel_time in zip(places, times):
+            if travel_time <= max_travel_time:
+                place['travel_time'] = round(travel_time / 60, 1)
+                place['travel_mode'] = travel_mode.lower()
+                reachable.append(place)
+        return reachable
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
@@ -0,0 +1,234 @@
+from core.app import FunctionCallingAgent
+from core.google_maps_api import find_places_within_travel_distance
+from core.help_functions.detecting_location import disambiguate_location
+from core.help_functions.ranking import rank_places
+from core.error.errors import LocationError
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import time
+
+# Seconds each stage may take before the query is answered with an error
+DEFAULT_STAGE_TIMEOUTS = {
+    'extract': 30,
+    'place_type': 30,
+    'location': 20,
+    'search': 60,
+    'rank': 30,
+    'store': 30,
+}
+
+
+class StageTimeoutError(Exception):
+    pass
+
+
+class QueryPipeline:
+    def __init__(
+        self,
+        agent: Optional[FunctionCallingAgent] = None,
+        vector_db=None,
+        collection_name: str = 'test_collection',
+        max_concurrency: int = 4,
+        stage_timeouts: Optional[Dict[str, float]] = None,
+        retriever=None,
+    ):
+        """
+        Async end-to-end pipeline: LLM extraction -> (place-type mapping || geocoding) -> Maps search
+        -> ranking -> vector store. Blocking stages run in worker threads so many queries can share
+        one event loop; the place-type LLM call and geocoding overlap.
+        Args:
+            agent: FunctionCallingAgent used for extraction and validation (created if None).
+            vector_db: Vector_DB to store ranked places in; results are not stored if None.
+            collection_name: Qdrant collection for stored places.
+            max_concurrency: Maximum number of queries processed at the same time.
+            stage_timeouts: Seconds per stage, merged over DEFAULT_STAGE_TIMEOUTS.
+            retriever: HybridRetriever serving searches from its vector store when it can; it
+                       stores the places of live searches itself.
+        """
+        self.agent = agent or FunctionCallingAgent()
+        self.vector_db = vector_db
+        self.collection_name = collection_name
+        self.max_concurrency = max_concurrency
+        self.stage_timeouts = {**DEFAULT_STAGE_TIMEOUTS, **(stage_timeouts or {})}
+        self.retriever = retriever
+        self._semaphore = None
+
+    async def _stage(self, name: str, func, *args, **kwargs):
+        """Run a blocking stage in a worker thread under the stage's timeout."""
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout=self.stage_timeouts[name])
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(f"Stage '{name}' timed out after {self.stage_timeouts[name]}s")
+
+    async def run(self, user_query: str, geolocation_coords: Optional[Tuple[float, float]] = None) -> Dict:
+        """
+        Process one user query end to end.
+        Args:
+            user_query: User input (e.g., "What's a good bakery within walking distance in Paris?").
+            geolocation_coords: User's current coordinates for "near me".
+        Returns:
+            Dict with status ("success", "prompt", "error"); on success also the validated fields,
+            the ranked places, their source ('store' or 'maps') and per-stage timings (seconds).
+        """
+        # Created lazily so the semaphore binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            try:
+                return await self._run(user_query, geolocation_coords)
+            except StageTimeoutError as e:
+                return {
+                    "status": "error",
+                    "error": str(e),
+                    "prompt": "Please try again."
+                }
+            except Exception as e:
+                # One failing query must not take down the others sharing the loop
+                print(f"Pipeline failed for query '{user_query}': {e}")
+                return {
+                    "status": "error",
+                    "error": "Failed to process query. Please try again.",
+                    "prompt": "Please rephrase your query and try again."
+                }
+
+    async def _run(self, user_query: str, geolocation_coords: Optional[Tuple[float, float]]) -> Dict:
+        timings = {}
+
+        # 1. LLM extraction
+        start = time.perf_counter()
+        try:
+            extracted = await self._stage('extract', self.agent.extract, user_query)
+        except StageTimeoutError:
+            raise
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": "Failed to process query. Please try again.",
+                "prompt": "Please rephrase your query and try again."
+            }
+        timings['extract'] = time.perf_counter() - start
+
+        # 2. Place-type mapping (an LLM call unless single_call) and geocoding are independent, run them together
+        start = time.perf_counter()
+        place_type, location_result = await asyncio.gather(
+            self._stage('place_type', self.agent.map_place_type, extracted["place_to_search"]),
+            self._resolve_location(extracted["location"], geolocation_coords),
+        )
+        timings['place_type_and_location'] = time.perf_counter() - start
+
+        validated = {"place_to_search": place_type}
+        errors = []
+
+        if isinstance(location_result, Exception):
+            errors.append(f"Location error: {location_result}")
+            validated["location"] = None
+        elif location_result.get("options"):
+            return self.agent.location_prompt(user_query, extracted, location_result["options"], geolocation_coords)
+        else:
+            validated["location"] = location_result
+
+        fields, field_errors = self.agent.validate_fields(extracted)
+        validated.update(fields)
+        errors.extend(field_errors)
+
+        if not errors and not validated["location"]["coordinates"]:
+            errors.append("Location error: no location found in the query")
+
+        if errors:
+            return {
+                "status": "error",
+                "errors": errors,
+                "prompt": "Please clarify the following issues:\n" + "\n".join(errors)
+            }
+
+        # 3. Google Maps search, or the vector store first when there is a retriever
+        start = time.perf_counter()
+        search_kwargs = dict(
+            location=validated["location"]["coordinates"],
+            minimum_star_requirement=validated["minimum_star_requirement"]["rating"] or 0,
+            place_type=validated["place_to_search"],
+            travel_mode=validated["travel_duration"]["mode"],
+            max_travel_time=travel_duration_seconds(validated["travel_duration"]),
+        )
+        if self.retriever is not None:
+            places, source = await self._stage(
+                'search', self.retriever.retrieve, additional_requests=validated["additional_requests"], **search_kwargs
+            )
+        else:
+            places, source = await self._stage('search', find_places_within_travel_distance, **search_kwargs), 'maps'
+        timings['search'] = time.perf_counter() - start
+
+        # 4. Ranking
+        start = time.perf_counter()
+        ranked_places = await self._stage('rank', rank_places, places, keywords=validated["additional_requests"])
+        timings['rank'] = time.perf_counter() - start
+
+        # 5. Store in the vector database
+        if self.vector_db is not None and self.retriever is None and ranked_places:
+            start = time.perf_counter()
+            await self._stage('store', self._store, ranked_places, validated["place_to_search"])
+            timings['store'] = time.perf_counter() - start
+
+        return {
+            "status": "success",
+            "validated": validated,
+            "places": ranked_places,
+            "source": source,
+            "timings": timings
+        }
+
+    async def _resolve_location(self, location: Optional[str], geolocation_coords: Optional[Tuple[float, float]]):
+        """Geocode without the interactive selection of FunctionCallingAgent._check_location."""
+        if not location:
+            return {"type": None, "value": None, "coordinates": None, "options": None}
+        try:
+            result = await self._stage('location', disambiguate_location, query=location, geolocation_coords=geolocation_coords)
+        except LocationError as e:
+            return e
+        if not result["options"] and not result["type"]:
+            return LocationError(f"Could not resolve location: {location}")
+        return result
+
+    def _store(self, ranked_places: List[Dict], place_type: str):
+        # place_type is stored so HybridRetriever can serve these places for later queries
+        self.vector_db.add_places(collection_name=self.collection_name, places=ranked_places, place_type=place_type)
+
+    async def run_many(self, user_queries: List[str], geolocation_coords: Optional[Tuple[float, float]] = None) -> List[Dict]:
+        """
+        Process many queries on the current event loop, at most max_concurrency at a time.
+        Results are returned in the order of user_queries.
+        """
+        return await asyncio.gather(*(self.run(user_query, geolocation_coords) for user_query in user_queries))
+
+
+def travel_duration_seconds(travel_duration: Dict) -> float:
+    """Validated travel_duration ({'value', 'unit', 'mode'}) in seconds."""
+    unit = (travel_duration.get("unit") or "seconds").lower()
+    multiplier = {"seconds": 1, "minutes": 60, "hours": 3600}[unit]
+    return float(travel_duration["value"]) * multiplier
+
+
+def run_queries(user_queries: List[str], **pipeline_kwargs) -> List[Dict]:
+    """Synchronous helper: run a batch of queries through a QueryPipeline on a fresh event loop."""
+    pipeline = QueryPipeline(**pipeline_kwargs)
+    return asyncio.run(pipeline.run_many(user_queries))
+
+
+if __name__ == '__main__':
+    user_querys = [
+        "What’s the good bakery within walking distance from my hotel in Paris?",
+        "Are there any nice parks in Toronto that are less than 15 minutes away on foot?",
+        "Find me a rooftop bar in New York City with at least 4 stars on Google Maps.",
+        "I need a quiet café to work from in Berlin, preferably within 15 minutes walking distance.",
+    ]
+
+    start = time.perf_counter()
+    results = run_queries(user_querys)
+    for user_query, result in zip(user_querys, results):
+        print(user_query)
+        print(result['status'], result.get('timings'))
+        for i, place in enumerate(result.get('places', [])[:5]):
+            print(f"  rank {i + 1}: {place['name']} ({place['combined_score']:.3f})")
+    print(f"Processed {len(user_querys)} queries in {time.perf_counter() - start:.1f}s")
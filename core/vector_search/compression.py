@@ -0,0 +1,182 @@
+from qdrant_client.http import models
+from typing import Optional
+import numpy as np
+import json
+import os
+
+REDUCTIONS = ('truncate', 'pca')
+QUANTIZATIONS = ('int8', 'binary')
+
+
+def normalize(vectors) -> np.ndarray:
+    """Scale vectors (last axis) to unit length, so dot product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+
+class VectorCompression:
+    def __init__(self, dimensions: Optional[int] = None, reduction: Optional[str] = None,
+                 quantization: Optional[str] = None, rescore: bool = True, oversampling: float = 3.0,
+                 on_disk: Optional[bool] = None):
+        """
+        How a collection stores its embeddings. Vectors are always normalized and compared by cosine
+        similarity; on top of that, dimensions can be reduced and the search index quantized.
+
+        Args:
+            dimensions: Stored dimensions when reduction is set.
+            reduction: 'truncate' keeps the first `dimensions` (Matryoshka-style, for models trained
+                       for it) and 'pca' projects onto the top principal components, which must
+                       be fitted with fit() on a representative sample (or loaded with load())
+                       before a collection is created with it.
+            quantization: 'int8' (scalar, 4x smaller) or 'binary' (1 bit per dimension, 32x smaller)
+                          index kept in RAM. Binary needs many dimensions of similar variance, so
+                          it does not combine well with PCA, which puts most of it in a few.
+            rescore: Re-rank the quantized candidates with the full vectors.
+            oversampling: Candidates fetched per result before rescoring.
+            on_disk: Keep the full vectors on disk; defaults to True when quantized, where they are
+                     only read for rescoring.
+        """
+        if reduction is not None and reduction not in REDUCTIONS:
+            raise ValueError(f"reduction must be one of {REDUCTIONS}")
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}")
+        if reduction and not dimensions:
+            raise ValueError("dimensions is required with a reduction")
+        self.dimensions = dimensions
+        self.reduction = reduction
+        self.quantization = quantization
+        self.rescore = rescore
+        self.oversampling = oversampling
+        self.on_disk = on_disk if on_disk is not None else quantization is not None
+        self.mean = None
+        self.components = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.reduction != 'pca' or self.components is not None
+
+    def fit(self, embeddings):
+        """Fit the PCA projection on a sample of (unnormalized or normalized) embeddings."""
+        embeddings = normalize(embeddings)
+        if len(embeddings) < self.dimensions:
+            raise ValueError(f"PCA to {self.dimensions} dimensions needs at least {self.dimensions} embeddings, got {len(embeddings)}")
+        self.mean = embeddings.mean(axis=0)
+        _, _, vt = np.linalg.svd(embeddings - self.mean, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:self.dimensions].T, dtype=np.float32)
+        return self
+
+    def transform(self, embeddings) -> np.ndarray:
+        """Normalize, reduce and normalize again: the vectors to store or to query with."""
+        embeddings = normalize(embeddings)
+        if self.reduction == 'truncate':
+            embeddings = embeddings[..., :self.dimensions]
+        elif self.reduction == 'pca':
+            if self.components is None:
+                raise ValueError("PCA reduction is not fitted")
+            embeddings = (embeddings - self.mean) @ self.components
+        return normalize(embeddings)
+
+    def size(self, embedding_size: int) -> int:
+        return self.dimensions if self.reduction else embedding_size
+
+    def vectors_config(self, embedding_size: int) -> models.VectorParams:
+        return models.VectorParams(size=self.size(embedding_size), distance=models.Distance.COSINE, on_disk=self.on_disk)
+
+    def quantization_config(self):
+        if self.quantization == 'int8':
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+            ))
+        if self.quantization == 'binary':
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        if self.quantization is None:
+            return None
+        return models.SearchParams(quantization=models.QuantizationSearchParams(
+            rescore=self.rescore, oversampling=self.oversampling
+        ))
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        config = {
+            'dimensions': self.dimensions,
+            'reduction': self.reduction,
+            'quantization': self.quantization,
+            'rescore': self.rescore,
+            'oversampling': self.oversampling,
+            'on_disk': self.on_disk,
+        }
+        arrays = {'mean': self.mean, 'components': self.components} if self.components is not None else {}
+        np.savez(path, config=json.dumps(config), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorCompression":
+        with np.load(path) as data:
+            compression = cls(**json.loads(str(data['config'])))
+            if 'components' in data:
+                compression.mean = data['mean']
+                compression.components = data['components']
+        return compression
+
+
+if __name__ == '__main__':
+    # Benchmark: recall@10 vs memory and latency of the compression options, on NumpyVectorStore
+    # usage: python -m core.vector_search.compression [num_points] [texts.txt]
+    # With a text file (one review per line) the real embedding model is used, otherwise synthetic
+    # embeddings with a decaying spectrum like sentence embeddings have.
+    from core.vector_search.numpy_store import NumpyVectorStore
+    import sys
+    import time
+
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    num_queries, limit = 100, 10
+    rng = np.random.default_rng(0)
+    if len(sys.argv) > 2:
+        from core.vector_search.vector_embedding import embedding_service
+        with open(sys.argv[2], 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()][:num_points + num_queries]
+        embedded = np.asarray(embedding_service.encode(texts, as_numpy=True), dtype=np.float32)
+        embeddings, queries = embedded[num_queries:], embedded[:num_queries]
+    else:
+        dim = 384
+        basis = rng.standard_normal((dim, dim)).astype(np.float32) * (np.arange(1, dim + 1) ** -0.6)[:, None]
+        embeddings = (rng.standard_normal((num_points + num_queries, dim)) @ basis).astype(np.float32)
+        embeddings, queries = embeddings[num_queries:], embeddings[:num_queries]
+
+    truth = np.argsort(-(normalize(queries) @ normalize(embeddings).T), axis=1)[:, :limit]
+    configs = [
+        ('float32', VectorCompression()),
+        ('int8', VectorCompression(quantization='int8')),
+        ('int8, no rescore', VectorCompression(quantization='int8', rescore=False)),
+        ('binary', VectorCompression(quantization='binary')),
+        ('binary, no rescore', VectorCompression(quantization='binary', rescore=False)),
+        ('binary, oversample 10', VectorCompression(quantization='binary', oversampling=10.0)),
+        ('truncate 128', VectorCompression(dimensions=128, reduction='truncate')),
+        ('pca 128', VectorCompression(dimensions=128, reduction='pca')),
+        ('pca 128 + int8', VectorCompression(dimensions=128, reduction='pca', quantization='int8')),
+    ]
+
+    print(f"{len(embeddings)} points, {embeddings.shape[1]} dims, {num_queries} queries, recall@{limit} against exact float32 cosine")
+    for name, compression in configs:
+        if not compression.fitted:
+            compression.fit(embeddings[rng.choice(len(embeddings), size=min(10_000, len(embeddings)), replace=False)])
+        store = NumpyVectorStore(dtype='float32')
+        store.create_collection('benchmark', vectors_config=compression.vectors_config(embeddings.shape[1]),
+                                quantization_config=compression.quantization_config())
+        vectors = compression.transform(embeddings)
+        store.upsert('benchmark', [models.PointStruct(id=i, vector=vector) for i, vector in enumerate(vectors)])
+
+        query_vectors = compression.transform(queries)
+        start = time.perf_counter()
+        results = [
+            [point.id for point in store.query_points('benchmark', query=query, limit=limit, with_payload=False,
+                                                      search_params=compression.search_params()).points]
+            for query in query_vectors
+        ]
+        latency = (time.perf_counter() - start) / num_queries * 1000
+        recall = np.mean([len(set(result) & set(answer)) / limit for result, answer in zip(results, truth)])
+        ram, disk = store.memory_usage('benchmark')
+        print(f"{name:22s} recall {recall:.3f} | {latency:6.2f} ms/query | in RAM {ram / 2 ** 20:6.1f} MiB"
+              f" ({embeddings.nbytes / max(ram, 1):4.1f}x smaller), full vectors {disk / 2 ** 20:6.1f} MiB")
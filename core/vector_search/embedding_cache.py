@@ -0,0 +1,170 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    def __init__(self, path='lib/cache/embeddings.sqlite3', max_entries=200_000, access_flush_size=1000):
+        """
+        On-disk embedding cache backed by SQLite.
+
+        Entries are keyed by model name plus a SHA-256 of the text, so the same review
+        embedded by the same model is only ever encoded once. Reads refresh the entry's
+        access time in memory; the times are written in batches (and before any eviction),
+        so a hit does not cost a write. Once the table grows past max_entries the least
+        recently used rows are evicted.
+
+        Args:
+            path (str): SQLite file location (created on first use). Use ':memory:' for a process-local cache.
+            max_entries (int): Maximum number of cached vectors before LRU eviction.
+            access_flush_size (int): Pending access-time updates that trigger a write.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.access_flush_size = access_flush_size
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._entries = 0
+        self._pending_access = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                       key TEXT PRIMARY KEY,
+                       model TEXT NOT NULL,
+                       dim INTEGER NOT NULL,
+                       vector BLOB NOT NULL,
+                       last_access REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+            self._conn.commit()
+            # Counted once; inserts and evictions keep it up to date
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            atexit.register(self.flush)
+        return self._conn
+
+    def flush(self):
+        """Write the pending access times."""
+        with self._lock:
+            if self._conn is not None:
+                self._flush_access(self._conn)
+
+    def _flush_access(self, conn):
+        # Caller holds self._lock
+        if self._pending_access:
+            conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self._pending_access.items()],
+            )
+            conn.commit()
+            self._pending_access = {}
+
+    def get_many(self, model_name, texts):
+        """
+        Look up cached vectors.
+
+        Args:
+            model_name (str): Model that produced the vectors.
+            texts (list): Texts to look up.
+
+        Returns:
+            dict: Maps position in texts to a float32 vector, for the hits only.
+        """
+        keys = [self.make_key(model_name, text) for text in texts]
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._pending_access.update((key, now) for key in found)
+                if len(self._pending_access) >= self.access_flush_size:
+                    self._flush_access(conn)
+
+            hits = {index: found[key] for index, key in enumerate(keys) if key in found}
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return hits
+
+    def put_many(self, model_name, texts, vectors):
+        """
+        Store vectors for texts and evict least recently used entries beyond max_entries.
+
+        Args:
+            model_name (str): Model that produced the vectors.
+            texts (list): Texts that were embedded.
+            vectors (np.ndarray): One row per text.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        now = time.time()
+        rows = [
+            (self.make_key(model_name, text), model_name, vector.shape[0], vector.tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            conn = self._connect()
+            # A key always maps to the same vector, so existing rows are left as they are
+            self._entries += conn.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows).rowcount
+            if self._entries > self.max_entries:
+                # Eviction needs the real access times, and another process may have added rows
+                self._flush_access(conn)
+                self._entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self._entries -= conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (max(self._entries - self.max_entries, 0),),
+                ).rowcount
+            conn.commit()
+
+    def stats(self):
+        """
+        Hit/miss counters since process start, plus the number of stored vectors.
+        """
+        with self._lock:
+            self._connect()
+            entries = self._entries
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+            self._entries = 0
+            self._pending_access = {}
+            self.hits = 0
+            self.misses = 0
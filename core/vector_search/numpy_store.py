@@ -0,0 +1,626 @@
+from qdrant_client.http import models
+from core.help_functions.geo import haversine_m
+from typing import Dict, List, Optional
+import numpy as np
+import threading
+import tempfile
+import json
+import os
+
+STORAGE_DTYPES = ('float32', 'float16', 'int8')
+QUANTIZATIONS = ('int8', 'binary')
+
+# Rows scored per matrix multiplication, bounds the temporary float32 copy of quantized vectors
+SCORE_CHUNK = 16_384
+
+
+class _Collection:
+    def __init__(self, size: int, distance: str, dtype: str, quantization: Optional[str] = None):
+        self.size = size
+        self.distance = distance
+        self.dtype = dtype
+        self.quantization = quantization
+        self.count = 0
+        self.vectors = np.empty((0, size), dtype=np.dtype(dtype))
+        self.scales = np.empty(0, dtype=np.float32)
+        # Quantized search index, scored first when quantization is set
+        if quantization == 'binary':
+            self.codes = np.empty((0, (size + 7) // 8), dtype=np.uint8)
+        else:
+            self.codes = np.empty((0, size if quantization else 0), dtype=np.int8)
+        self.code_scales = np.empty(0, dtype=np.float32)
+        self.lat = np.empty(0)
+        self.lon = np.empty(0)
+        self.alive = np.empty(0, dtype=bool)
+        self.assign = np.empty(0, dtype=np.int32)
+        self.ids = []
+        self.rows: Dict[str, int] = {}
+        self.payloads: List[dict] = []
+        self.float_fields: Dict[str, np.ndarray] = {}
+        self.keyword_fields: Dict[str, Dict[str, set]] = {}
+        self.centroids = None
+        # Directory the collection was loaded from; its vectors are memory-mapped from there
+        self.directory = None
+
+    def reserve(self, extra: int):
+        needed = self.count + extra
+        capacity = len(self.alive)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+
+        def grow(array, fill):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            return grown
+
+        if isinstance(self.vectors, np.memmap):
+            self.vectors = self._grow_mapped(capacity)
+        else:
+            self.vectors = grow(self.vectors, 0)
+        self.scales = grow(self.scales, 0)
+        self.codes = grow(self.codes, 0)
+        self.code_scales = grow(self.code_scales, 0)
+        self.lat = grow(self.lat, np.nan)
+        self.lon = grow(self.lon, np.nan)
+        self.alive = grow(self.alive, False)
+        self.assign = grow(self.assign, -1)
+        for name, column in self.float_fields.items():
+            self.float_fields[name] = grow(column, np.nan)
+
+    def _grow_mapped(self, capacity: int) -> np.memmap:
+        """Memory-mapped vectors move to a larger mapped file, copied in chunks, rather than into RAM."""
+        fd, path = tempfile.mkstemp(suffix='.npy', dir=self.directory)
+        os.close(fd)
+        grown = np.lib.format.open_memmap(path, mode='w+', dtype=self.vectors.dtype, shape=(capacity, self.size))
+        for start in range(0, self.count, SCORE_CHUNK):
+            stop = min(start + SCORE_CHUNK, self.count)
+            grown[start:stop] = self.vectors[start:stop]
+        try:
+            # The mapping keeps the data reachable; the name is not needed (fails on Windows, harmless)
+            os.remove(path)
+        except OSError:
+            pass
+        return grown
+
+
+class NumpyVectorStore:
+    def __init__(self, path: Optional[str] = None, dtype: str = 'float16', brute_force_limit: int = 20_000, nprobe: int = 8):
+        """
+        In-process vector store implementing the part of the QdrantClient API that Vector_DB uses
+        (collections, upsert/delete, query_points, scroll, retrieve, count, payload indexes), so
+        tests and small deployments need no server and searches pay no HTTP hop.
+
+        Search is exact brute force over the rows that pass the payload filter, on vectors stored
+        as float32, float16 (half the memory) or int8 with a per-vector scale (a quarter). For large
+        unfiltered scans an optional IVF index (build_index) restricts scoring to the nearest
+        clusters. Geo points are read from the 'geo' payload field ({'lat', 'lon'}); filters support
+        `must` lists of geo_radius, range and match (MatchValue / MatchAny) conditions.
+
+        Args:
+            path: Directory to persist collections in (save()); existing collections are loaded
+                  from it, vectors as copy-on-write memory maps (moved to a larger mapped file in
+                  the same directory when points are added, not into RAM).
+            dtype: Vector storage type for new collections: 'float32', 'float16' or 'int8'.
+            brute_force_limit: Filtered candidate count above which an IVF index is used if built.
+            nprobe: IVF clusters scored per query.
+        """
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"dtype must be one of {STORAGE_DTYPES}")
+        self.path = path
+        self.dtype = dtype
+        self.brute_force_limit = brute_force_limit
+        self.nprobe = nprobe
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.RLock()
+        if path and os.path.isdir(path):
+            for name in os.listdir(path):
+                if os.path.exists(os.path.join(path, name, 'meta.json')):
+                    self._collections[name] = self._load(os.path.join(path, name))
+
+    # Collections
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections
+
+    def create_collection(self, collection_name: str, vectors_config: models.VectorParams, quantization_config=None, **kwargs):
+        """
+        Scalar (int8) and binary quantization configs add a quantized copy of the vectors that
+        query_points scores first, rescoring the best candidates with the stored vectors.
+        """
+        if isinstance(quantization_config, models.ScalarQuantization):
+            quantization = 'int8'
+        elif isinstance(quantization_config, models.BinaryQuantization):
+            quantization = 'binary'
+        elif quantization_config is None:
+            quantization = None
+        else:
+            raise NotImplementedError(f"Unsupported quantization: {type(quantization_config).__name__}")
+        with self._lock:
+            distance = 'cosine' if vectors_config.distance == models.Distance.COSINE else 'dot'
+            self._collections[collection_name] = _Collection(vectors_config.size, distance, self.dtype, quantization)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs):
+        with self._lock:
+            return self._collections.pop(collection_name, None) is not None
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        """FLOAT/INTEGER fields become NumPy columns, KEYWORD fields value -> rows maps; GEO is always indexed."""
+        collection = self._get(collection_name)
+        with self._lock:
+            if field_schema in (models.PayloadSchemaType.FLOAT, models.PayloadSchemaType.INTEGER):
+                column = np.full(len(collection.alive), np.nan)
+                for row in range(collection.count):
+                    column[row] = _as_float(collection.payloads[row], field_name)
+                collection.float_fields[field_name] = column
+            elif field_schema == models.PayloadSchemaType.KEYWORD:
+                index = {}
+                for row in range(collection.count):
+                    if collection.alive[row]:
+                        value = collection.payloads[row].get(field_name)
+                        if value is not None:
+                            index.setdefault(str(value), set()).add(row)
+                collection.keyword_fields[field_name] = index
+
+    def _get(self, collection_name: str) -> _Collection:
+        try:
+            return self._collections[collection_name]
+        except KeyError:
+            raise ValueError(f"Collection {collection_name} not found")
+
+    # Writes
+
+    @staticmethod
+    def _encode(vectors: np.ndarray, dtype: str):
+        """Vectors in a storage type ('float32', 'float16', 'int8' or 'binary') and their per-vector scales."""
+        ones = np.ones(len(vectors), dtype=np.float32)
+        if dtype == 'binary':
+            return np.packbits(vectors > 0, axis=1), ones
+        if dtype == 'int8':
+            scales = np.clip(np.abs(vectors).max(axis=1), 1e-12, None) / 127.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(dtype), ones
+
+    def upsert(self, collection_name: str, points: List[models.PointStruct], **kwargs):
+        collection = self._get(collection_name)
+        if not points:
+            return
+        vectors = np.asarray([point.vector for point in points], dtype=np.float32).reshape(-1, collection.size)
+        if collection.distance == 'cosine':
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        encoded, scales = self._encode(vectors, collection.dtype)
+        codes, code_scales = self._encode(vectors, collection.quantization) if collection.quantization else (encoded, scales)
+        with self._lock:
+            collection.reserve(len(points))
+            for point, vector, scale, code, code_scale in zip(points, encoded, scales, codes, code_scales):
+                key = str(point.id)
+                row = collection.rows.get(key)
+                if row is None:
+                    row = collection.count
+                    collection.count += 1
+                    collection.rows[key] = row
+                    collection.ids.append(point.id)
+                    collection.payloads.append(None)
+                else:
+                    self._unindex(collection, row)
+                payload = point.payload or {}
+                collection.vectors[row] = vector
+                collection.scales[row] = scale
+                if collection.quantization:
+                    collection.codes[row] = code
+                    collection.code_scales[row] = code_scale
+                collection.payloads[row] = payload
+                collection.alive[row] = True
+                geo = payload.get('geo') or {}
+                collection.lat[row] = _as_float(geo, 'lat')
+                collection.lon[row] = _as_float(geo, 'lon')
+                for name, column in collection.float_fields.items():
+                    column[row] = _as_float(payload, name)
+                for name, index in collection.keyword_fields.items():
+                    if payload.get(name) is not None:
+                        index.setdefault(str(payload[name]), set()).add(row)
+                if collection.centroids is not None:
+                    collection.assign[row] = int(np.argmax(collection.centroids @ self._decode(collection, [row])[0]))
+
+    def _unindex(self, collection: _Collection, row: int):
+        payload = collection.payloads[row] or {}
+        for name, index in collection.keyword_fields.items():
+            rows = index.get(str(payload.get(name)))
+            if rows is not None:
+                rows.discard(row)
+
+    def delete(self, collection_name: str, points_selector, **kwargs):
+        """Delete by a list of ids, a PointIdsList or a Filter."""
+        collection = self._get(collection_name)
+        with self._lock:
+            if isinstance(points_selector, models.Filter):
+                rows = np.flatnonzero(self._mask(collection, points_selector))
+            else:
+                ids = points_selector.points if isinstance(points_selector, models.PointIdsList) else points_selector
+                rows = [collection.rows[str(point_id)] for point_id in ids if str(point_id) in collection.rows]
+            for row in rows:
+                self._unindex(collection, int(row))
+                collection.alive[row] = False
+                del collection.rows[str(collection.ids[row])]
+
+    # Reads
+
+    def count(self, collection_name: str, count_filter: Optional[models.Filter] = None, **kwargs) -> models.CountResult:
+        collection = self._get(collection_name)
+        with self._lock:
+            return models.CountResult(count=int(self._mask(collection, count_filter).sum()))
+
+    def retrieve(self, collection_name: str, ids: list, with_payload=True, with_vectors=False, **kwargs) -> List[models.Record]:
+        collection = self._get(collection_name)
+        with self._lock:
+            rows = [collection.rows[str(point_id)] for point_id in ids if str(point_id) in collection.rows]
+            return [self._record(collection, row, with_payload, with_vectors) for row in rows]
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[models.Filter] = None, limit: int = 10,
+               offset=None, with_payload=True, with_vectors=False, **kwargs):
+        """Pages through matching points in insertion order; offsets are row positions."""
+        collection = self._get(collection_name)
+        with self._lock:
+            rows = np.flatnonzero(self._mask(collection, scroll_filter))
+            start = int(offset or 0)
+            rows = rows[rows >= start]
+            page = rows[:limit]
+            next_offset = int(rows[limit]) if len(rows) > limit else None
+            return [self._record(collection, row, with_payload, with_vectors) for row in page], next_offset
+
+    def query_points(self, collection_name: str, query, query_filter: Optional[models.Filter] = None, limit: int = 10,
+                     with_payload=True, with_vectors=False, score_threshold: Optional[float] = None,
+                     search_params: Optional[models.SearchParams] = None, **kwargs) -> models.QueryResponse:
+        """
+        Nearest points to the query vector among those matching query_filter. In quantized
+        collections the quantized index picks limit * oversampling candidates (search_params,
+        default 1), which are rescored with the stored vectors unless rescore is False.
+        """
+        collection = self._get(collection_name)
+        quantization = search_params.quantization if search_params is not None else None
+        query = np.asarray(query, dtype=np.float32)
+        if collection.distance == 'cosine':
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        with self._lock:
+            mask = self._mask(collection, query_filter)
+            if collection.centroids is not None and mask.sum() > self.brute_force_limit:
+                # Only clusters whose centroid is closest to the query, plus rows added before they had one
+                probed = np.argsort(-(collection.centroids @ query))[:self.nprobe]
+                assign = collection.assign[:collection.count]
+                mask &= np.isin(assign, probed) | (assign < 0)
+            rows = np.flatnonzero(mask)
+            if collection.quantization and not (quantization and quantization.ignore):
+                scores = self._scores(collection, rows, query, quantized=True)
+                candidates = max(limit, int(np.ceil(limit * ((quantization and quantization.oversampling) or 1.0))))
+                if len(rows) > candidates:
+                    top = np.argpartition(-scores, candidates - 1)[:candidates]
+                    rows, scores = rows[top], scores[top]
+                if quantization is None or quantization.rescore is not False:
+                    scores = self._scores(collection, rows, query)
+            else:
+                scores = self._scores(collection, rows, query)
+
+        if score_threshold is not None:
+            keep = scores >= score_threshold
+            rows, scores = rows[keep], scores[keep]
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return models.QueryResponse(points=[
+            models.ScoredPoint(
+                id=collection.ids[rows[i]],
+                version=0,
+                score=float(scores[i]),
+                payload=self._select(collection.payloads[rows[i]], with_payload),
+                vector=self._decode(collection, [rows[i]])[0].tolist() if with_vectors else None
+            )
+            for i in order
+        ])
+
+    def _scores(self, collection: _Collection, rows: np.ndarray, query: np.ndarray, quantized: bool = False) -> np.ndarray:
+        if quantized:
+            vectors, scales, dtype = collection.codes, collection.code_scales, collection.quantization
+        else:
+            vectors, scales, dtype = collection.vectors, collection.scales, collection.dtype
+        if dtype == 'binary':
+            query_bits = np.packbits(query > 0)
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), SCORE_CHUNK):
+            chunk = rows[start:start + SCORE_CHUNK]
+            if chunk[-1] - chunk[0] + 1 == len(chunk):
+                # Unfiltered scans cover consecutive rows: a view instead of a gathered copy
+                block = vectors[chunk[0]:chunk[-1] + 1]
+            else:
+                block = vectors[chunk]
+            if dtype == 'binary':
+                # Share of matching signs, mapped to [-1, 1] like a cosine
+                hamming = np.bitwise_count(block ^ query_bits).sum(axis=1)
+                scores[start:start + len(chunk)] = 1.0 - 2.0 * hamming / collection.size
+                continue
+            scores[start:start + len(chunk)] = block.astype(np.float32, copy=False) @ query
+            if dtype == 'int8':
+                scores[start:start + len(chunk)] *= scales[chunk]
+        return scores
+
+    def _decode(self, collection: _Collection, rows) -> np.ndarray:
+        vectors = collection.vectors[rows].astype(np.float32)
+        if collection.dtype == 'int8':
+            vectors *= collection.scales[rows][:, None]
+        return vectors
+
+    def _record(self, collection: _Collection, row: int, with_payload, with_vectors) -> models.Record:
+        return models.Record(
+            id=collection.ids[row],
+            payload=self._select(collection.payloads[row], with_payload),
+            vector=self._decode(collection, [row])[0].tolist() if with_vectors else None
+        )
+
+    @staticmethod
+    def _select(payload: dict, with_payload):
+        if with_payload is True:
+            return dict(payload)
+        if not with_payload:
+            return None
+        return {key: payload[key] for key in with_payload if key in payload}
+
+    # Filters
+
+    def _mask(self, collection: _Collection, query_filter: Optional[models.Filter]) -> np.ndarray:
+        mask = collection.alive[:collection.count].copy()
+        if query_filter is None:
+            return mask
+        if query_filter.should or query_filter.must_not:
+            raise NotImplementedError("NumpyVectorStore supports 'must' filters only")
+        conditions = query_filter.must or []
+        if not isinstance(conditions, list):
+            conditions = [conditions]
+        # Cheap conditions first so geo distances are computed for fewer rows
+        for condition in sorted(conditions, key=lambda condition: condition.geo_radius is not None):
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                break
+            mask[rows] = self._condition(collection, condition, rows)
+        return mask
+
+    def _condition(self, collection: _Collection, condition: models.FieldCondition, rows: np.ndarray) -> np.ndarray:
+        key = condition.key
+        if condition.geo_radius is not None:
+            if key == 'geo':
+                lat, lon = collection.lat[rows], collection.lon[rows]
+            else:
+                points = [(collection.payloads[row].get(key) or {}) for row in rows]
+                lat = np.array([point.get('lat', np.nan) for point in points], dtype=np.float64)
+                lon = np.array([point.get('lon', np.nan) for point in points], dtype=np.float64)
+            center, radius = condition.geo_radius.center, condition.geo_radius.radius
+            # Bounding box on latitude first, then exact distances for what is left
+            lat_delta = np.degrees(radius / 6_371_008.8)
+            near = np.abs(lat - center.lat) <= lat_delta
+            result = np.zeros(len(rows), dtype=bool)
+            if near.any():
+                distances = haversine_m((center.lat, center.lon), np.column_stack([lat[near], lon[near]]))
+                result[near] = distances <= radius
+            return result
+
+        if condition.range is not None:
+            if key in collection.float_fields:
+                values = collection.float_fields[key][rows]
+            else:
+                values = np.array([_as_float(collection.payloads[row], key) for row in rows])
+            result = ~np.isnan(values)
+            bounds = condition.range
+            with np.errstate(invalid='ignore'):
+                if bounds.gte is not None:
+                    result &= values >= bounds.gte
+                if bounds.gt is not None:
+                    result &= values > bounds.gt
+                if bounds.lte is not None:
+                    result &= values <= bounds.lte
+                if bounds.lt is not None:
+                    result &= values < bounds.lt
+            return result
+
+        if condition.match is not None:
+            match = condition.match
+            if isinstance(match, models.MatchAny):
+                wanted = {str(value) for value in match.any}
+            elif isinstance(match, models.MatchValue):
+                wanted = {str(match.value)}
+            else:
+                raise NotImplementedError(f"Unsupported match condition: {type(match).__name__}")
+            if key in collection.keyword_fields:
+                index = collection.keyword_fields[key]
+                matching = set().union(*(index.get(value, set()) for value in wanted))
+                return np.isin(rows, np.fromiter(matching, dtype=np.int64, count=len(matching)))
+            return np.array([str(collection.payloads[row].get(key)) in wanted for row in rows], dtype=bool)
+
+        raise NotImplementedError(f"Unsupported condition on '{key}'")
+
+    def memory_usage(self, collection_name: str):
+        """
+        Bytes of the index scanned by every query (the quantized codes, or the vectors when not
+        quantized) and of the stored vectors. Quantized collections only read the stored vectors
+        for rescoring, so once loaded from disk (memory-mapped) they mostly stay there.
+        """
+        collection = self._get(collection_name)
+        count = collection.count
+        vectors = collection.vectors[:count].nbytes + collection.scales[:count].nbytes
+        if not collection.quantization:
+            return vectors, vectors
+        return collection.codes[:count].nbytes + collection.code_scales[:count].nbytes, vectors
+
+    # IVF index
+
+    def build_index(self, collection_name: str, nlist: Optional[int] = None, iterations: int = 10, sample_size: int = 50_000, seed: int = 0):
+        """
+        Cluster the collection's vectors with k-means (nlist centroids, default ~sqrt(n)) so large
+        searches only score the nprobe nearest clusters. Points added later are assigned to their
+        nearest centroid on upsert.
+        """
+        collection = self._get(collection_name)
+        with self._lock:
+            rows = np.flatnonzero(collection.alive[:collection.count])
+            if len(rows) == 0:
+                return
+            nlist = nlist or max(1, int(np.sqrt(len(rows))))
+            rng = np.random.default_rng(seed)
+            sample = self._decode(collection, rng.choice(rows, size=min(sample_size, len(rows)), replace=False))
+            sample /= np.clip(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12, None)
+            centroids = sample[rng.choice(len(sample), size=min(nlist, len(sample)), replace=False)]
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for cluster in range(len(centroids)):
+                    members = sample[labels == cluster]
+                    if len(members):
+                        centroid = members.mean(axis=0)
+                        centroids[cluster] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+            collection.centroids = centroids.astype(np.float32)
+            for start in range(0, len(rows), SCORE_CHUNK):
+                chunk = rows[start:start + SCORE_CHUNK]
+                collection.assign[chunk] = np.argmax(self._decode(collection, chunk) @ collection.centroids.T, axis=1)
+
+    # Persistence
+
+    def save(self, path: Optional[str] = None):
+        """Write every collection to path (default: the store's path) as .npy arrays plus JSON."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path to save the vector store to")
+        with self._lock:
+            for name, collection in self._collections.items():
+                directory = os.path.join(path, name)
+                os.makedirs(directory, exist_ok=True)
+                count = collection.count
+                for array_name in ('vectors', 'scales', 'codes', 'code_scales', 'lat', 'lon', 'alive', 'assign'):
+                    _save_array(os.path.join(directory, f'{array_name}.npy'), getattr(collection, array_name)[:count])
+                for field_name, column in collection.float_fields.items():
+                    _save_array(os.path.join(directory, f'float_{field_name}.npy'), column[:count])
+                if collection.centroids is not None:
+                    _save_array(os.path.join(directory, 'centroids.npy'), collection.centroids)
+                with open(os.path.join(directory, 'payloads.jsonl'), 'w', encoding='utf-8') as f:
+                    for payload in collection.payloads:
+                        f.write(json.dumps(payload, ensure_ascii=False) + '\n')
+                with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'size': collection.size,
+                        'distance': collection.distance,
+                        'dtype': collection.dtype,
+                        'quantization': collection.quantization,
+                        'ids': collection.ids,
+                        'float_fields': list(collection.float_fields),
+                        'keyword_fields': list(collection.keyword_fields),
+                    }, f)
+
+    def _load(self, directory: str) -> _Collection:
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        collection = _Collection(meta['size'], meta['distance'], meta['dtype'], meta.get('quantization'))
+        # Copy-on-write map: pages are read from disk on demand, writes stay in memory
+        collection.vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='c')
+        collection.directory = directory
+        for array_name in ('scales', 'codes', 'code_scales', 'lat', 'lon', 'alive', 'assign'):
+            setattr(collection, array_name, np.load(os.path.join(directory, f'{array_name}.npy')))
+        collection.count = len(collection.alive)
+        collection.ids = meta['ids']
+        with open(os.path.join(directory, 'payloads.jsonl'), 'r', encoding='utf-8') as f:
+            collection.payloads = [json.loads(line) for line in f]
+        collection.rows = {str(point_id): row for row, point_id in enumerate(collection.ids) if collection.alive[row]}
+        for field_name in meta['float_fields']:
+            collection.float_fields[field_name] = np.load(os.path.join(directory, f'float_{field_name}.npy'))
+        centroids_path = os.path.join(directory, 'centroids.npy')
+        if os.path.exists(centroids_path):
+            collection.centroids = np.load(centroids_path)
+        self._collections[os.path.basename(directory)] = collection
+        for field_name in meta['keyword_fields']:
+            self.create_payload_index(os.path.basename(directory), field_name, models.PayloadSchemaType.KEYWORD)
+        return collection
+
+
+def _save_array(path: str, array: np.ndarray):
+    """np.save through a temporary file, so a memory-mapped array of the same path is never truncated under it."""
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        np.save(f, array)
+    os.replace(temporary, path)
+
+
+def _as_float(payload: dict, key: str) -> float:
+    value = payload.get(key) if payload else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+if __name__ == '__main__':
+    # Benchmark: NumpyVectorStore (float32 / float16 / int8 / int8 + IVF) vs Qdrant, unfiltered and geo-filtered
+    # usage: python -m core.vector_search.numpy_store [num_points] [qdrant_url]  (Qdrant in-memory by default)
+    from qdrant_client import QdrantClient
+    import sys
+    import time
+
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    qdrant = QdrantClient(url=sys.argv[2]) if len(sys.argv) > 2 else QdrantClient(":memory:")
+    dim, num_queries, limit = 384, 50, 10
+    rng = np.random.default_rng(0)
+
+    # Clustered vectors, like embeddings of reviews about similar places
+    centers = rng.standard_normal((200, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), num_points)] + 0.5 * rng.standard_normal((num_points, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(0, num_points, num_queries)] + 0.1 * rng.standard_normal((num_queries, dim)).astype(np.float32)
+    lats = 40.75 + rng.uniform(-0.18, 0.18, num_points)
+    lngs = -73.98 + rng.uniform(-0.24, 0.24, num_points)
+    geo_filter = models.Filter(must=[models.FieldCondition(
+        key="geo", geo_radius=models.GeoRadius(center=models.GeoPoint(lat=40.7580, lon=-73.9855), radius=3000)
+    )])
+
+    def load(client):
+        if client.collection_exists('benchmark'):
+            client.delete_collection('benchmark')
+        client.create_collection('benchmark', vectors_config=models.VectorParams(size=dim, distance=models.Distance.DOT))
+        client.create_payload_index('benchmark', field_name="geo", field_schema=models.PayloadSchemaType.GEO)
+        start = time.perf_counter()
+        for i in range(0, num_points, 5000):
+            client.upsert(collection_name='benchmark', points=[
+                models.PointStruct(id=j, vector=vectors[j].tolist(), payload={'geo': {'lat': lats[j], 'lon': lngs[j]}})
+                for j in range(i, min(i + 5000, num_points))
+            ])
+        return time.perf_counter() - start
+
+    def search(client, query_filter):
+        start = time.perf_counter()
+        results = [
+            {point.id for point in client.query_points('benchmark', query=query.tolist(), query_filter=query_filter, limit=limit).points}
+            for query in queries
+        ]
+        return results, (time.perf_counter() - start) / num_queries * 1000
+
+    # Exact answers for recall@10
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :limit]
+    in_circle = haversine_m((40.7580, -73.9855), np.column_stack([lats, lngs])) <= 3000
+    exact_geo = [set(np.flatnonzero(in_circle)[np.argsort(-(vectors[in_circle] @ query))[:limit]]) for query in queries]
+
+    def recall(results, truth):
+        return np.mean([len(result & set(answer)) / limit for result, answer in zip(results, truth)])
+
+    backends = [('qdrant', qdrant, None)]
+    for dtype in STORAGE_DTYPES:
+        backends.append((f'numpy {dtype}', NumpyVectorStore(dtype=dtype), None))
+    backends.append(('numpy int8 + IVF', NumpyVectorStore(dtype='int8', brute_force_limit=10_000, nprobe=8), 'ivf'))
+
+    print(f"{num_points} points, {dim} dims, {num_queries} queries")
+    for name, client, index in backends:
+        load_time = load(client)
+        if index:
+            client.build_index('benchmark')
+        results, latency = search(client, None)
+        geo_results, geo_latency = search(client, geo_filter)
+        memory = ''
+        if isinstance(client, NumpyVectorStore):
+            collection = client._collections['benchmark']
+            memory = f", vectors {collection.vectors[:collection.count].nbytes / 2 ** 20:.0f} MiB"
+        print(f"{name:18s} load {load_time:5.1f}s | {latency:6.2f} ms/query, recall@{limit} {recall(results, exact):.3f} | "
+              f"geo {geo_latency:6.2f} ms/query, recall@{limit} {recall(geo_results, exact_geo):.3f}{memory}")
@@ -1,77 +1,307 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, Range
+from qdrant_client.models import PointStruct, Filter, FieldCondition, Range, GeoRadius, GeoPoint, PayloadSchemaType, MatchAny, MatchValue
 # from qdrant_client.models import PointStruct
 # from qdrant_client.models import Filter, FieldCondition, MatchValue
 # from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, Range
 
-from core.vector_search.vector_embedding import vector_embedding
+from core.vector_search.vector_embedding import embedding_service
+from core.vector_search.numpy_store import NumpyVectorStore
+from core.vector_search.compression import VectorCompression, normalize
+from core.help_functions.geo import haversine_m
 from sentence_transformers import SentenceTransformer
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import weakref
 import uuid
-import torch
-import math
+import copy
+import time
+import os
 import numpy as np
 
+# Namespace for point ids derived from Google place_ids
+PLACE_ID_NAMESPACE = uuid.UUID('5b0d2a3e-8f61-4c3b-9a57-2f1d6c0e4b91')
+
+# Collections known to exist in this process, so ingestion skips the round trip: per server url,
+# and per client object for clients passed in or created in-process (their id() is reused once
+# they are garbage-collected, so it cannot be the key)
+_existing_collections = {}
+_client_collections = weakref.WeakKeyDictionary()
+_existing_collections_lock = threading.Lock()
+
+# Place fields that are not stored: constant notes, and values that only make sense for the query
+# that found the place (travel time from that user's origin, ranking scores)
+PAYLOAD_EXCLUDE = {'reviews', 'review_note', 'travel_time', 'travel_mode', 'combined_score', 'average_similarity', 'distance_km'}
+REVIEW_FIELDS = ('author', 'rating', 'text', 'timestamp')
+
+# How review-level hits are turned into one score per place
+REVIEW_SCORING = ('max', 'top_k_mean')
+
+BACKENDS = ('qdrant', 'numpy')
+
+REVIEW_SUFFIX = "_reviews"
+
+
+def point_id(place_data):
+    """
+    Deterministic point id for a place: uuid5 of its Google place_id (of name and address for
+    places without one), so ingesting the same place again updates its point.
+    """
+    key = place_data.get('place_id') or f"{place_data.get('name')}|{place_data.get('address')}"
+    return str(uuid.uuid5(PLACE_ID_NAMESPACE, key))
+
+
+def review_collection(collection_name):
+    """Companion collection holding one point per review of the places in collection_name."""
+    return f"{collection_name}{REVIEW_SUFFIX}"
+
+
 class Vector_DB:
-    def __init__(self):
-        self.client = QdrantClient(url="http://localhost:6333")
+    def __init__(self, url="http://localhost:6333", client=None, backend='qdrant', path=None, dtype='float16',
+                 compression=None, compression_dir='lib/cache/collections'):
+        """
+        Args:
+            url: Qdrant server.
+            client: Existing client to use instead (e.g., QdrantClient(":memory:") or a NumpyVectorStore).
+            backend: 'qdrant' (server at url) or 'numpy' (in-process NumpyVectorStore, no server needed).
+            path: Directory the numpy backend loads from and saves to (db.client.save()).
+            dtype: Vector storage of the numpy backend: 'float32', 'float16' or 'int8'.
+            compression: VectorCompression for every collection, or a dict of collection name ->
+                         VectorCompression (others get the default: normalized, full size, no
+                         quantization). A review collection uses the compression of its places.
+                         A PCA compression must be fitted (fit() on a representative sample of
+                         review embeddings) unless a projection was saved for the collection.
+            compression_dir: Where PCA projections are saved when a collection is created, so
+                             later runs embed queries and new places the same way.
+
+        Raises:
+            ValueError: A named collection's PCA compression is not fitted and none is saved, or
+                        the saved one was made with different dimensions, reduction or quantization.
+        """
+        if isinstance(compression, VectorCompression):
+            self.default_compression, self.compressions = compression, {}
+        else:
+            self.default_compression, self.compressions = VectorCompression(), dict(compression or {})
+        self.compression_dir = compression_dir
+        for collection_name in list(self.compressions):
+            self.compression(collection_name)
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}")
+        if client is None and backend == 'numpy':
+            client = NumpyVectorStore(path=path, dtype=dtype)
+        with _existing_collections_lock:
+            if client is None:
+                self._existing_collections = _existing_collections.setdefault(url, set())
+            else:
+                self._existing_collections = _client_collections.setdefault(client, set())
+        self.client = client or QdrantClient(url=url)
+
+    def ensure_collection(self, collection_name, size=384, keyword_fields=()):
+        """Create the collection unless this process has already seen it."""
+        if collection_name in self._existing_collections:
+            return
+        with _existing_collections_lock:
+            if collection_name in self._existing_collections:
+                return
+            if not self.client.collection_exists(collection_name=collection_name):
+                self.create_collection(collection_name, size=size, keyword_fields=keyword_fields)
+            self._existing_collections.add(collection_name)
         
-    def create_collection(self, collection_name, size=384):
+    def _compression_name(self, collection_name):
+        """Collection whose compression collection_name uses: a review collection uses its places'."""
+        if collection_name.endswith(REVIEW_SUFFIX) and collection_name not in self.compressions:
+            return collection_name[:-len(REVIEW_SUFFIX)]
+        return collection_name
+
+    def _compression_path(self, collection_name):
+        return os.path.join(self.compression_dir, f"{self._compression_name(collection_name)}.npz")
+
+    def compression(self, collection_name):
+        """
+        VectorCompression of a collection. An unfitted PCA projection is loaded from the one saved
+        for the collection; ValueError if there is none or it was saved with another configuration.
+        """
+        path = self._compression_path(collection_name)
+        collection_name = self._compression_name(collection_name)
+        if collection_name not in self.compressions:
+            # Own copy, so a projection loaded for one collection is not used for the others
+            self.compressions[collection_name] = copy.copy(self.default_compression)
+        compression = self.compressions[collection_name]
+        if compression.fitted:
+            return compression
+        if not os.path.exists(path):
+            raise ValueError(
+                f"PCA compression of '{collection_name}' is not fitted: call fit() on a representative "
+                f"sample of review embeddings first, or save a fitted projection to {path}"
+            )
+        saved = VectorCompression.load(path)
+        for field in ('dimensions', 'reduction', 'quantization'):
+            if getattr(saved, field) != getattr(compression, field):
+                raise ValueError(
+                    f"Compression saved in {path} has {field}={getattr(saved, field)!r}, "
+                    f"but '{collection_name}' is configured with {getattr(compression, field)!r}"
+                )
+        compression.mean, compression.components = saved.mean, saved.components
+        return compression
+
+    def embed_query(self, collection_name, query_text):
+        """Query vector in the collection's (normalized, possibly reduced) vector space."""
+        query_vector = embedding_service.encode([query_text], as_numpy=True)[0]
+        return self.compression(collection_name).transform(query_vector).tolist()
+
+    def create_collection(self, collection_name, size=384, keyword_fields=()):
+        """
+        Create a cosine collection for `size`-dimensional embeddings, stored as the collection's
+        VectorCompression specifies (reduced size, quantized index). A PCA projection is saved
+        with the collection, so later runs embed into the same space.
+        """
+        compression = self.compression(collection_name)
+        if compression.reduction == 'pca':
+            compression.save(self._compression_path(collection_name))
         self.client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=size, distance=Distance.DOT),
+            vectors_config=compression.vectors_config(size),
+            quantization_config=compression.quantization_config(),
         )
+        # Only small fields that queries filter on are indexed
+        self.client.create_payload_index(collection_name, field_name="geo", field_schema=PayloadSchemaType.GEO)
+        self.client.create_payload_index(collection_name, field_name="rating", field_schema=PayloadSchemaType.FLOAT)
+        self.client.create_payload_index(collection_name, field_name="indexed_at", field_schema=PayloadSchemaType.FLOAT)
+        for field_name in keyword_fields:
+            self.client.create_payload_index(collection_name, field_name=field_name, field_schema=PayloadSchemaType.KEYWORD)
         
     def add_vectors(self, collection_name, place_data):
-        # Extract review texts for embedding
-        review_texts = [review['text'] for review in place_data['reviews']]
-        
-        # If no reviews, skip or handle accordingly
-        if not review_texts:
-            print(f"No reviews for {place_data.get('name', 'unknown place')}, skipping.")
-            return
+        """Add one place; see add_places for ingesting many at once."""
+        if self.add_places(collection_name, [place_data]):
+            print(f"Successfully added place '{place_data.get('name', 'unknown')}' with aggregated embedding to Qdrant collection '{collection_name}'")
 
-        # Prepare metadata (exclude reviews since they are embedded)
-        metadata = {key: value for key, value in place_data.items() if key != 'reviews'}
-        # Include review-specific metadata
-        for i, review in enumerate(place_data['reviews']):
-            metadata[f'review_{i}_text'] = review['text']
-            metadata[f'review_{i}_author'] = review['author']
-            metadata[f'review_{i}_rating'] = review['rating']
-            metadata[f'review_{i}_time'] = review['time']
-            metadata[f'review_{i}_timestamp'] = review['timestamp']
-
-        # Generate embeddings for reviews
-        embeddings, embeddings_shape = vector_embedding(review_texts)
-
-        # Convert embeddings to numpy array if they're tensors
-        if torch.is_tensor(embeddings):
-            embeddings = embeddings.cpu().numpy()
-
-        # Aggregate embeddings by taking the mean
-        aggregated_embedding = np.mean(embeddings, axis=0)
-
-        # Ensure collection exists
-        if not self.client.collection_exists(collection_name=collection_name):
-            self.create_collection(collection_name, size=embeddings_shape)
-
-        # Prepare single point for the place
-        point = PointStruct(
-            id=str(uuid.uuid4()),  # Unique ID for the place
-            vector=aggregated_embedding.tolist(),  # Convert to list
-            payload=metadata  # All metadata, including review details
-        )
+    @staticmethod
+    def _geo(place_data):
+        # Geo point in Qdrant's format, for the indexed radius search
+        location = place_data.get('location')
+        if location and location[0] is not None and location[1] is not None:
+            return {'lat': location[0], 'lon': location[1]}
+        return None
 
-        # Upload point
-        self.client.upsert(
-            collection_name=collection_name,
-            points=[point]
-        )
-        print(f"Successfully added place '{place_data.get('name', 'unknown')}' with aggregated embedding to Qdrant collection '{collection_name}'")
+    @classmethod
+    def _payload(cls, place_data, indexed_at, place_type=None):
+        """
+        Compact place payload: place fields plus the reviews as one nested list, in the same shape
+        find_places_within_travel_distance returns, so stored places can be ranked directly.
+        'indexed_at' (Unix time) lets readers skip places not refreshed recently.
+        """
+        metadata = {key: value for key, value in place_data.items() if key not in PAYLOAD_EXCLUDE}
+        geo = cls._geo(place_data)
+        if geo:
+            metadata['geo'] = geo
+        metadata['indexed_at'] = indexed_at
+        if place_type:
+            metadata['place_type'] = place_type
+        metadata['reviews'] = [
+            {field: review.get(field) for field in REVIEW_FIELDS} for review in place_data['reviews']
+        ]
+        return metadata
+
+    def add_places(self, collection_name, places, batch_size=256, parallel=1, per_review=False, place_type=None):
+        """
+        Bulk ingestion: embed the reviews of all places in one batch, mean-pool the normalized
+        review embeddings per place and upsert the points in batches. Vectors are compressed as
+        configured for the collection.
+
+        Point ids come from point_id(), so re-ingesting a place overwrites its point instead of
+        adding a duplicate.
+
+        With per_review, every review is also stored as its own point in review_collection(),
+        carrying only the linked place's point id, geo point and rating; see
+        find_nearby_places_by_reviews.
+
+        Args:
+            collection_name (str): Name of the Qdrant collection (created if missing).
+            places (list): Place dicts as returned by find_places_within_travel_distance.
+            batch_size (int): Points per upsert request.
+            parallel (int): Number of upsert requests in flight (server only; the local
+                            in-memory client is not thread-safe).
+            per_review (bool): Also index each review as a separate point.
+            place_type (str, optional): Google place type the places were found as, stored for
+                                        find_nearby_points(place_type=...).
+
+        Returns:
+            int: Number of places written (places without reviews are skipped).
+        """
+        review_texts = []
+        offsets = []
+        kept = []
+        for place_data in places:
+            texts = [review['text'] for review in place_data.get('reviews', [])]
+            if not texts:
+                print(f"No reviews for {place_data.get('name', 'unknown place')}, skipping.")
+                continue
+            offsets.append(len(review_texts))
+            review_texts.extend(texts)
+            kept.append(place_data)
+        if not kept:
+            return 0
+
+        # One encode call for every review, then the mean of each place's segment
+        embeddings = normalize(embedding_service.encode(review_texts, as_numpy=True))
+        counts = np.diff(offsets + [len(review_texts)])
+        aggregated = np.add.reduceat(embeddings, offsets, axis=0) / counts[:, None]
+
+        self.ensure_collection(collection_name, size=embeddings.shape[1], keyword_fields=("place_type",))
+        compression = self.compression(collection_name)
+
+        # Last occurrence wins when a batch holds the same place twice
+        points = {}
+        indexed_at = time.time()
+        for place_data, vector in zip(kept, compression.transform(aggregated)):
+            payload = self._payload(place_data, indexed_at, place_type)
+            point = PointStruct(id=point_id(place_data), vector=vector.tolist(), payload=payload)
+            points[point.id] = point
+        self._upsert(collection_name, list(points.values()), batch_size, parallel)
+
+        if per_review:
+            reviews_name = review_collection(collection_name)
+            self.ensure_collection(reviews_name, size=embeddings.shape[1], keyword_fields=("place",))
+            # A place may have fewer reviews than last time, so its old review points go first
+            self.client.delete(
+                collection_name=reviews_name,
+                points_selector=Filter(must=[FieldCondition(key="place", match=MatchAny(any=list(points)))]),
+                wait=True
+            )
+            review_vectors = compression.transform(embeddings)
+            review_points = {}
+            for place_data, offset, count in zip(kept, offsets, counts):
+                place = point_id(place_data)
+                for i in range(count):
+                    review_id = str(uuid.uuid5(PLACE_ID_NAMESPACE, f"{place}#{i}"))
+                    review_points[review_id] = PointStruct(
+                        id=review_id,
+                        vector=review_vectors[offset + i].tolist(),
+                        payload={'place': place, 'review': i, 'geo': self._geo(place_data), 'rating': place_data.get('rating')}
+                    )
+            self._upsert(reviews_name, list(review_points.values()), batch_size, parallel)
+        return len(kept)
+
+    def _upsert(self, collection_name, points, batch_size, parallel):
+        batches = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+        def upsert(batch):
+            self.client.upsert(collection_name=collection_name, points=batch, wait=True)
+
+        if parallel > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                list(executor.map(upsert, batches))
+        else:
+            for batch in batches:
+                upsert(batch)
         
-    def find_nearby_points(self, collection_name, latitude, longitude, radius_km=1.0, query_text=None, limit=10):
+    def find_nearby_points(self, collection_name, latitude, longitude, radius_km=1.0, query_text=None, limit=10,
+                           min_rating=None, order_by=None, place_type=None, indexed_after=None):
         """
         Find points within a given radius (in km) of the specified coordinates.
         Optionally, combine with vector search if query_text is provided.
+
+        Uses Qdrant's geo-radius filter on the indexed 'geo' payload, then checks every hit with an
+        exact haversine distance, which is added to the payload as 'distance_km'.
         
         Args:
             collection_name (str): Name of the Qdrant collection.
@@ -80,60 +310,187 @@ class Vector_DB:
             radius_km (float): Radius in kilometers to search within.
             query_text (str, optional): Text to perform vector search on reviews.
             limit (int): Maximum number of results to return.
+            min_rating (float, optional): Only return places rated at least this high.
+            order_by (str, optional): 'distance' or 'score'; defaults to 'score' with query_text
+                                      and 'distance' without.
+            place_type (str, optional): Only return places stored with this place type.
+            indexed_after (float, optional): Only return places stored or refreshed after this Unix time.
         
         Returns:
-            List of tuples (payload, score) for matching points.
+            List of tuples (payload, score) for matching points (score is None without query_text).
         """
-        # Calculate bounding box for the radius
-        # Approximate 1 degree of latitude/longitude to kilometers
-        lat_degree = 111.0  # 1 degree of latitude ~ 111 km
-        lon_degree = 111.0 * math.cos(math.radians(latitude))  # Adjust longitude based on latitude
-
-        lat_delta = radius_km / lat_degree
-        lon_delta = radius_km / lon_degree
-
-        lat_min = latitude - lat_delta
-        lat_max = latitude + lat_delta
-        lon_min = longitude - lon_delta
-        lon_max = longitude + lon_delta
-
-        # Create payload filter for location
-        location_filter = Filter(
-            must=[
-                FieldCondition(
-                    key="location[0]",  # Latitude
-                    range=Range(gte=lat_min, lte=lat_max)
-                ),
-                FieldCondition(
-                    key="location[1]",  # Longitude
-                    range=Range(gte=lon_min, lte=lon_max)
-                )
-            ]
-        )
+        location_filter = self._geo_filter(latitude, longitude, radius_km, min_rating, place_type, indexed_after)
+        order_by = order_by or ('score' if query_text else 'distance')
 
         if query_text:
             # Perform vector search with payload filter
-            embeddings, _ = vector_embedding([query_text])
-            if torch.is_tensor(embeddings):
-                embeddings = embeddings.cpu().tolist()
-            query_vector = embeddings[0]
-            
-            search_result = self.client.search(
+            hits = self.client.query_points(
                 collection_name=collection_name,
-                query_vector=query_vector,
+                query=self.embed_query(collection_name, query_text),
                 query_filter=location_filter,
+                search_params=self.compression(collection_name).search_params(),
                 limit=limit,
                 with_payload=True
-            )
+            ).points
+            results = [(hit.payload, hit.score) for hit in hits]
         else:
-            # Perform scroll query with payload filter (no vector search)
-            search_result = self.client.scroll(
-                collection_name=collection_name,
-                scroll_filter=location_filter,
-                limit=limit,
-                with_payload=True,
-                with_vectors=False
-            )[0]  # Extract points from (points, next_page_offset)
+            # Every point in the circle is needed to return the nearest ones, not the first ones by id
+            results = []
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=location_filter,
+                    limit=1000,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False
+                )
+                results.extend((record.payload, None) for record in records)
+                if offset is None:
+                    break
+
+        kept = self._within_radius(results, latitude, longitude, radius_km)
+        if order_by == 'distance':
+            kept.sort(key=lambda result: result[0]['distance_km'])
+        return kept[:limit]
+
+    @staticmethod
+    def _geo_filter(latitude, longitude, radius_km, min_rating=None, place_type=None, indexed_after=None):
+        conditions = [
+            FieldCondition(
+                key="geo",
+                geo_radius=GeoRadius(center=GeoPoint(lat=latitude, lon=longitude), radius=radius_km * 1000)
+            )
+        ]
+        if min_rating is not None:
+            conditions.append(FieldCondition(key="rating", range=Range(gte=min_rating)))
+        if place_type is not None:
+            conditions.append(FieldCondition(key="place_type", match=MatchValue(value=place_type)))
+        if indexed_after is not None:
+            conditions.append(FieldCondition(key="indexed_at", range=Range(gte=indexed_after)))
+        return Filter(must=conditions)
+
+    @staticmethod
+    def _within_radius(results, latitude, longitude, radius_km):
+        """Exact great-circle check of (payload, score) results; adds 'distance_km' to each payload."""
+        if not results:
+            return []
+        # Drops anything the server's approximation let through
+        points = [(payload['geo']['lat'], payload['geo']['lon']) for payload, _ in results]
+        distances_km = haversine_m((latitude, longitude), points) / 1000
+        return [
+            (dict(payload, distance_km=float(distance)), score)
+            for (payload, score), distance in zip(results, distances_km)
+            if distance <= radius_km
+        ]
+
+    def find_nearby_places_by_reviews(self, collection_name, latitude, longitude, query_text, radius_km=1.0, limit=10,
+                                      scoring='max', top_k=3, candidates=None, min_rating=None):
+        """
+        Vector search over individual reviews (stored with add_places(per_review=True)), aggregated
+        to one score per place, so a single review matching the query is not averaged away.
+
+        Args:
+            collection_name (str): Place collection; reviews are read from review_collection(collection_name).
+            latitude, longitude (float): Query point.
+            query_text (str): Text to match reviews against.
+            radius_km (float): Radius in kilometers to search within.
+            limit (int): Maximum number of places to return.
+            scoring (str): 'max' (best review) or 'top_k_mean' (mean of the top_k best reviews;
+                           places with fewer matching reviews average over the ones found).
+            top_k (int): Reviews per place for 'top_k_mean'.
+            candidates (int, optional): Review hits to aggregate; defaults to 10 * limit.
+            min_rating (float, optional): Only return places rated at least this high.
+
+        Returns:
+            List of tuples (place payload, aggregated score), best first.
+        """
+        if scoring not in REVIEW_SCORING:
+            raise ValueError(f"scoring must be one of {REVIEW_SCORING}")
+
+        reviews_name = review_collection(collection_name)
+        hits = self.client.query_points(
+            collection_name=reviews_name,
+            query=self.embed_query(reviews_name, query_text),
+            query_filter=self._geo_filter(latitude, longitude, radius_km, min_rating),
+            search_params=self.compression(reviews_name).search_params(),
+            limit=candidates or 10 * limit,
+            with_payload=["place"]
+        ).points
+
+        # Hits arrive best first, so each place's list is already sorted
+        place_scores = {}
+        for hit in hits:
+            place_scores.setdefault(hit.payload["place"], []).append(hit.score)
+        depth = 1 if scoring == 'max' else top_k
+        aggregated = sorted(
+            ((sum(scores[:depth]) / len(scores[:depth]), place) for place, scores in place_scores.items()),
+            reverse=True
+        )
+
+        # Fetch the place payloads of the best places only, a few spare for the radius check
+        best = aggregated[:limit * 2]
+        records = self.client.retrieve(collection_name=collection_name, ids=[place for _, place in best], with_payload=True)
+        payloads = {str(record.id): record.payload for record in records}
+        results = [(payloads[place], score) for score, place in best if place in payloads]
+        return self._within_radius(results, latitude, longitude, radius_km)[:limit]
+
+
+if __name__ == '__main__':
+    # Benchmark: indexed geo-radius search vs the previous bounding box over location[0]/location[1]
+    # usage: python -m core.vector_search.vector_db [num_points] [qdrant_url]  (in-memory by default)
+    import math
+    import sys
+    import time
+
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    client = QdrantClient(url=sys.argv[2]) if len(sys.argv) > 2 else QdrantClient(":memory:")
+    collection_name = 'geo_benchmark'
+    dim = 32
+    rng = np.random.default_rng(0)
+
+    db = Vector_DB(client=client)
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    db.create_collection(collection_name, size=dim)
+
+    start = time.perf_counter()
+    # Points spread over roughly 40 x 40 km around Manhattan
+    lats = 40.75 + rng.uniform(-0.18, 0.18, num_points)
+    lngs = -73.98 + rng.uniform(-0.24, 0.24, num_points)
+    vectors = rng.standard_normal((num_points, dim)).astype(np.float32)
+    for i in range(0, num_points, 5000):
+        client.upsert(collection_name=collection_name, points=[
+            PointStruct(
+                id=j,
+                vector=vectors[j].tolist(),
+                payload={'location': [lats[j], lngs[j]], 'geo': {'lat': lats[j], 'lon': lngs[j]}, 'rating': 4.0}
+            )
+            for j in range(i, min(i + 5000, num_points))
+        ])
+    print(f"Inserted {num_points} points in {time.perf_counter() - start:.1f}s")
+
+    center, radius_km = (40.7580, -73.9855), 1.0
+    lat_delta = radius_km / 111.0
+    lon_delta = radius_km / (111.0 * math.cos(math.radians(center[0])))
+    box_filter = Filter(must=[
+        FieldCondition(key="location[0]", range=Range(gte=center[0] - lat_delta, lte=center[0] + lat_delta)),
+        FieldCondition(key="location[1]", range=Range(gte=center[1] - lon_delta, lte=center[1] + lon_delta)),
+    ])
+
+    start = time.perf_counter()
+    box, offset = [], None
+    while True:
+        records, offset = client.scroll(collection_name, scroll_filter=box_filter, limit=1000, offset=offset)
+        box.extend(records)
+        if offset is None:
+            break
+    box_time = time.perf_counter() - start
 
-        return [(result.payload, result.score if query_text else None) for result in search_result]
+    start = time.perf_counter()
+    circle = db.find_nearby_points(collection_name, center[0], center[1], radius_km=radius_km, limit=num_points)
+    circle_time = time.perf_counter() - start
 
+    print(f"bounding box: {len(box)} points (square, unsorted) in {box_time * 1000:.1f} ms")
+    print(f"geo radius:   {len(circle)} points (circle, nearest first) in {circle_time * 1000:.1f} ms")
@@ -1,12 +1,160 @@
 from sentence_transformers import SentenceTransformer
+from core.vector_search.embedding_cache import EmbeddingCache
+from collections import defaultdict
+import numpy as np
+import threading
+import time
 import torch
 
-def vector_embedding(sentences):
-        model = SentenceTransformer("all-MiniLM-L6-v2")
-        if torch.cuda.is_available():
-            model = model.to(torch.device('cuda'))
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+class EmbeddingService:
+    def __init__(self, cache=None):
+        """
+        Process-wide registry of SentenceTransformer models.
+
+        Each model is loaded once per process and shared by every caller. Loading is
+        guarded by a per-model lock so concurrent first calls don't load the same
+        model twice, while different models can still load in parallel.
+
+        Args:
+            cache (EmbeddingCache, optional): Persistent cache consulted before encoding.
+        """
+        self.cache = cache
+        self._models = {}
+        self._model_locks = defaultdict(threading.Lock)
+        self._registry_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    @staticmethod
+    def device():
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+    def get_model(self, model_name=DEFAULT_MODEL):
+        """
+        Return the shared model instance for model_name, loading it on first use.
+
+        Args:
+            model_name (str): SentenceTransformer model name or path.
+
+        Returns:
+            SentenceTransformer: The loaded model.
+        """
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._registry_lock:
+            model_lock = self._model_locks[model_name]
+
+        with model_lock:
+            # Another thread may have finished loading while we waited
+            model = self._models.get(model_name)
+            if model is not None:
+                return model
+
+            start = time.perf_counter()
+            model = SentenceTransformer(model_name, device=self.device())
+            elapsed = time.perf_counter() - start
+
+            self._models[model_name] = model
+            self._record(model_name, load_seconds=elapsed)
+            print(f"Loaded embedding model '{model_name}' on {self.device()} in {elapsed:.2f}s")
+            return model
+
+    def encode(self, sentences, model_name=DEFAULT_MODEL, as_numpy=False):
+        """
+        Encode sentences with the shared model.
+
+        Args:
+            sentences (list): Texts to embed.
+            model_name (str): SentenceTransformer model name or path.
+            as_numpy (bool): Always return a float32 numpy array, even on cuda.
+
+        Returns:
+            Tensor on cuda when available, numpy array otherwise (same as the model's encode).
+        """
+        if self.cache is not None:
+            embeddings = self._encode_cached(sentences, model_name)
+            if self.device() == 'cuda' and not as_numpy:
+                return torch.from_numpy(embeddings).to('cuda')
+            return embeddings
+
+        model = self.get_model(model_name)
+        start = time.perf_counter()
+        if as_numpy:
+            embeddings = model.encode(sentences, convert_to_numpy=True, device=self.device())
+        elif self.device() == 'cuda':
             embeddings = model.encode(sentences, convert_to_tensor=True, device='cuda')
         else:
             embeddings = model.encode(sentences)
+        self._record(model_name, encode_seconds=time.perf_counter() - start, sentences=len(sentences))
+        return embeddings
+
+    def _encode_cached(self, sentences, model_name):
+        """
+        Serve what we can from the cache and encode the misses as one batch.
+        """
+        sentences = list(sentences)
+        if not sentences:
+            return np.empty((0, self.get_model(model_name).get_sentence_embedding_dimension()), dtype=np.float32)
+        hits = self.cache.get_many(model_name, sentences)
+
+        # Encode each distinct missing text once
+        missing = list(dict.fromkeys(sentence for index, sentence in enumerate(sentences) if index not in hits))
+        encoded = {}
+        if missing:
+            model = self.get_model(model_name)
+            start = time.perf_counter()
+            vectors = model.encode(missing, convert_to_numpy=True, device=self.device()).astype(np.float32, copy=False)
+            self._record(model_name, encode_seconds=time.perf_counter() - start, sentences=len(missing))
+            self.cache.put_many(model_name, missing, vectors)
+            encoded = dict(zip(missing, vectors))
+
+        return np.stack([hits[index] if index in hits else encoded[sentence] for index, sentence in enumerate(sentences)])
+
+    def warm_up(self, model_names=(DEFAULT_MODEL,)):
+        """
+        Load the given models and run one dummy encode so the first real request
+        doesn't pay for model loading or lazy kernel initialisation.
+        """
+        for model_name in model_names:
+            self.encode(["warm up"], model_name=model_name)
+
+    def is_loaded(self, model_name=DEFAULT_MODEL):
+        return model_name in self._models
+
+    def stats(self):
+        """
+        Timing statistics per model: load time, number of encode calls,
+        sentences encoded and total encode time (seconds).
+        """
+        with self._stats_lock:
+            return {name: dict(values) for name, values in self._stats.items()}
+
+    def _record(self, model_name, load_seconds=None, encode_seconds=None, sentences=0):
+        with self._stats_lock:
+            entry = self._stats.setdefault(model_name, {
+                'load_seconds': 0.0,
+                'encode_calls': 0,
+                'sentences': 0,
+                'encode_seconds': 0.0,
+            })
+            if load_seconds is not None:
+                entry['load_seconds'] = load_seconds
+            if encode_seconds is not None:
+                entry['encode_calls'] += 1
+                entry['sentences'] += sentences
+                entry['encode_seconds'] += encode_seconds
+
+
+# Shared by the whole process
+embedding_service = EmbeddingService(cache=EmbeddingCache())
+
+
+def vector_embedding(sentences, model_name=DEFAULT_MODEL):
+        embeddings = embedding_service.encode(sentences, model_name=model_name)
         embeddings_shape = embeddings.shape[1]
-        return embeddings, embeddings_shape
\ No newline at end of file
+        return embeddings, embeddings_shape